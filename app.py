@@ -9,6 +9,7 @@ import dash_bootstrap_components as dbc
 
 from app.styles import get_index_string
 from app.layout import create_layout
+from app.routes import register_routes
 
 # Import callbacks to register them with the app
 import app.callbacks  # noqa: F401
@@ -30,5 +31,8 @@ dash_app.layout = create_layout()
 # Server for deployment (e.g., Gunicorn)
 server = dash_app.server
 
+# Upload and download routes
+register_routes(server)
+
 if __name__ == "__main__":
     dash_app.run(debug=True, host="0.0.0.0", port=8050)
@@ -1,16 +1,15 @@
 """Callback definitions for the Priva PDF application."""
 
-import base64
-import tempfile
-import zipfile
 from pathlib import Path
 
-from dash import callback, dcc, html, Input, Output, State, ALL, ctx
+from dash import callback, dcc, html, no_update, Input, Output, State, ALL, ctx
 from dash.exceptions import PreventUpdate
 import dash_bootstrap_components as dbc
 
-from src.pdf_tool import PdfTool
-from .config import COMPRESSION_DESCRIPTIONS, get_compression_level
+from .config import COMPRESSION_DESCRIPTIONS, JOB_POLL_INTERVAL_MS, get_compression_level
+from .jobs import QueueFullError, compress_job, job_manager, merge_job, split_job
+from .routes import download_url
+from .storage import upload_store
 from .components import (
     create_upload_component,
     create_file_list,
@@ -20,10 +19,12 @@ from .components import (
     create_success_alert,
     create_error_alert,
     create_download_button,
+    create_job_tracker,
+    create_job_progress,
 )
 
-# Initialize the PDF tool
-pdf_tool = PdfTool()
+_EXPIRED_MESSAGE = "Uploaded file has expired. Please upload it again."
+_QUEUED_LABEL = "Waiting for a free worker…"
 
 
 # =============================================================================
@@ -55,7 +56,7 @@ def _create_merge_tab() -> html.Div:
             create_output_input("merge-output-name", "merged.pdf"),
             html.Button("Merge PDFs", id="merge-btn", className="btn-primary-custom"),
         ]),
-        dcc.Loading(html.Div(id="merge-result"), type="circle", color="#f59e0b"),
+        create_job_tracker("merge", JOB_POLL_INTERVAL_MS),
     ])
 
 
@@ -84,7 +85,7 @@ def _create_split_tab() -> html.Div:
             html.Div(id="split-mode-options"),
             html.Button("Split PDF", id="split-btn", className="btn-primary-custom", style={"marginTop": "1rem"}),
         ]),
-        dcc.Loading(html.Div(id="split-result"), type="circle", color="#f59e0b"),
+        create_job_tracker("split", JOB_POLL_INTERVAL_MS),
     ])
 
 
@@ -99,7 +100,7 @@ def _create_compress_tab() -> html.Div:
             create_output_input("compress-output-name", "compressed.pdf"),
             html.Button("Compress PDF", id="compress-btn", className="btn-primary-custom"),
         ]),
-        dcc.Loading(html.Div(id="compress-result"), type="circle", color="#f59e0b"),
+        create_job_tracker("compress", JOB_POLL_INTERVAL_MS),
     ])
 
 
@@ -109,31 +110,16 @@ def _create_compress_tab() -> html.Div:
 
 @callback(
     Output("merge-files-store", "data"),
-    Input("merge-upload", "contents"),
-    State("merge-upload", "filename"),
+    Input("merge-upload-complete", "data"),
     State("merge-files-store", "data"),
     prevent_initial_call=True,
 )
-def handle_merge_upload(contents, filenames, existing_files):
+def handle_merge_upload(uploaded, existing_files):
     """Handle file uploads for merge."""
-    if contents is None:
+    if not uploaded:
         raise PreventUpdate
     
-    if not isinstance(contents, list):
-        contents = [contents]
-        filenames = [filenames]
-    
-    new_files = []
-    for content, filename in zip(contents, filenames):
-        _, content_string = content.split(",")
-        decoded = base64.b64decode(content_string)
-        new_files.append({
-            "name": filename,
-            "content": content_string,
-            "size": len(decoded),
-        })
-    
-    return (existing_files or []) + new_files
+    return (existing_files or []) + uploaded["files"]
 
 
 @callback(
@@ -212,48 +198,45 @@ def reorder_merge_files(up_clicks, down_clicks, files):
 
 @callback(
     Output("merge-result", "children"),
+    Output("merge-job", "data"),
+    Output("merge-job-poll", "disabled"),
     Input("merge-btn", "n_clicks"),
     State("merge-files-store", "data"),
     State("merge-output-name", "value"),
     prevent_initial_call=True,
 )
 def merge_pdfs(n_clicks, files, output_name):
-    """Execute PDF merge."""
+    """Queue a PDF merge."""
     if not n_clicks or not files:
         raise PreventUpdate
     
     if len(files) < 2:
-        return create_error_alert("Please upload at least 2 PDF files to merge.")
+        return create_error_alert("Please upload at least 2 PDF files to merge."), None, True
     
     if not output_name.endswith(".pdf"):
         output_name += ".pdf"
     
     try:
-        with tempfile.TemporaryDirectory() as tmp_dir:
-            tmp_path = Path(tmp_dir)
-            
-            input_paths = []
-            for f in files:
-                file_path = tmp_path / f["name"]
-                file_path.write_bytes(base64.b64decode(f["content"]))
-                input_paths.append(file_path)
-            
-            output_path = tmp_path / output_name
-            result_path = pdf_tool.merge(input_paths, output_path)
-            
-            result_bytes = result_path.read_bytes()
-            result_b64 = base64.b64encode(result_bytes).decode()
-            
-            return html.Div([
-                create_success_alert(f"✓ Successfully merged {len(files)} PDFs!"),
-                create_download_button(
-                    f"data:application/pdf;base64,{result_b64}",
-                    output_name,
-                    "Download Merged PDF"
-                ),
-            ])
-    except Exception as e:
-        return create_error_alert(f"Error merging PDFs: {str(e)}")
+        inputs = [upload_store.get(f["id"]) for f in files]
+        job_id = job_manager.submit(merge_job, inputs, output_name)
+    except KeyError:
+        return create_error_alert(_EXPIRED_MESSAGE), None, True
+    except QueueFullError as e:
+        return create_error_alert(str(e)), None, True
+    
+    job = {"id": job_id, "file_count": len(files)}
+    return create_job_progress("merge", _QUEUED_LABEL), job, False
+
+
+def _render_merge_result(job: dict, result: dict) -> html.Div:
+    return html.Div([
+        create_success_alert(f"✓ Successfully merged {job['file_count']} PDFs!"),
+        create_download_button(
+            download_url(result["blob_id"], result["name"]),
+            result["name"],
+            "Download Merged PDF"
+        ),
+    ])
 
 
 # =============================================================================
@@ -262,23 +245,15 @@ def merge_pdfs(n_clicks, files, output_name):
 
 @callback(
     Output("compress-file-store", "data"),
-    Input("compress-upload", "contents"),
-    State("compress-upload", "filename"),
+    Input("compress-upload-complete", "data"),
     prevent_initial_call=True,
 )
-def handle_compress_upload(content, filename):
+def handle_compress_upload(uploaded):
     """Handle file upload for compression."""
-    if content is None:
+    if not uploaded:
         raise PreventUpdate
     
-    _, content_string = content.split(",")
-    decoded = base64.b64decode(content_string)
-    
-    return {
-        "name": filename,
-        "content": content_string,
-        "size": len(decoded),
-    }
+    return uploaded["files"][0]
 
 
 @callback(
@@ -316,6 +291,8 @@ def update_compress_level_desc(level):
 
 @callback(
     Output("compress-result", "children"),
+    Output("compress-job", "data"),
+    Output("compress-job-poll", "disabled"),
     Input("compress-btn", "n_clicks"),
     State("compress-file-store", "data"),
     State("compress-level", "value"),
@@ -323,7 +300,7 @@ def update_compress_level_desc(level):
     prevent_initial_call=True,
 )
 def compress_pdf(n_clicks, file_data, level, output_name):
-    """Execute PDF compression."""
+    """Queue a PDF compression."""
     if not n_clicks or not file_data:
         raise PreventUpdate
     
@@ -333,33 +310,31 @@ def compress_pdf(n_clicks, file_data, level, output_name):
     compression_level = get_compression_level(level)
     
     try:
-        with tempfile.TemporaryDirectory() as tmp_dir:
-            tmp_path = Path(tmp_dir)
-            
-            input_path = tmp_path / file_data["name"]
-            input_path.write_bytes(base64.b64decode(file_data["content"]))
-            
-            output_path = tmp_path / output_name
-            result_path = pdf_tool.compress(input_path, output_path, compression_level)
-            
-            result_bytes = result_path.read_bytes()
-            result_b64 = base64.b64encode(result_bytes).decode()
-            
-            original_size_kb = file_data["size"] / 1024
-            new_size_kb = len(result_bytes) / 1024
-            reduction = ((original_size_kb - new_size_kb) / original_size_kb) * 100
-            
-            return html.Div([
-                create_success_alert("✓ Compression complete!"),
-                create_metrics(original_size_kb, new_size_kb, reduction),
-                create_download_button(
-                    f"data:application/pdf;base64,{result_b64}",
-                    output_name,
-                    "Download Compressed PDF"
-                ),
-            ])
-    except Exception as e:
-        return create_error_alert(f"Error compressing PDF: {str(e)}")
+        source = upload_store.get(file_data["id"])
+        job_id = job_manager.submit(compress_job, source, compression_level.name, output_name)
+    except KeyError:
+        return create_error_alert(_EXPIRED_MESSAGE), None, True
+    except QueueFullError as e:
+        return create_error_alert(str(e)), None, True
+    
+    job = {"id": job_id, "original_size": file_data["size"]}
+    return create_job_progress("compress", _QUEUED_LABEL), job, False
+
+
+def _render_compress_result(job: dict, result: dict) -> html.Div:
+    original_size_kb = job["original_size"] / 1024
+    new_size_kb = result["size"] / 1024
+    reduction = ((original_size_kb - new_size_kb) / original_size_kb) * 100
+    
+    return html.Div([
+        create_success_alert("✓ Compression complete!"),
+        create_metrics(original_size_kb, new_size_kb, reduction),
+        create_download_button(
+            download_url(result["blob_id"], result["name"]),
+            result["name"],
+            "Download Compressed PDF"
+        ),
+    ])
 
 
 # =============================================================================
@@ -368,29 +343,19 @@ def compress_pdf(n_clicks, file_data, level, output_name):
 
 @callback(
     Output("split-file-store", "data"),
-    Input("split-upload", "contents"),
-    State("split-upload", "filename"),
+    Input("split-upload-complete", "data"),
     prevent_initial_call=True,
 )
-def handle_split_upload(content, filename):
+def handle_split_upload(uploaded):
     """Handle file upload for splitting."""
-    if content is None:
+    if not uploaded:
         raise PreventUpdate
     
-    _, content_string = content.split(",")
-    decoded = base64.b64decode(content_string)
-    
-    with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as tmp:
-        tmp.write(decoded)
-        tmp.flush()
-        page_count = pdf_tool.get_page_count(Path(tmp.name))
+    file_data = uploaded["files"][0]
+    if file_data["page_count"] is None:
+        raise PreventUpdate
     
-    return {
-        "name": filename,
-        "content": content_string,
-        "size": len(decoded),
-        "page_count": page_count,
-    }
+    return file_data
 
 
 @callback(
@@ -444,10 +409,11 @@ def update_split_mode_options(mode, file_data):
             dbc.Input(
                 id="split-pages-input", 
                 type="text", 
-                placeholder=f"e.g., 1, 3, 5-7 (max: {page_count})",
+                placeholder=f"e.g., 1, 3, 5-7 or 5, 1, 1, 3 (max: {page_count})",
                 className="form-control"
             ),
-            html.Div("Enter page numbers separated by commas. Use hyphens for ranges (e.g., 1-3).", 
+            html.Div("Enter page numbers separated by commas, in the order you want them. "
+                     "Use hyphens for ranges (e.g., 1-3).", 
                     className="compression-desc"),
             dcc.Store(id="split-start-page", data=1),
             dcc.Store(id="split-end-page", data=page_count),
@@ -469,7 +435,12 @@ def update_split_mode_options(mode, file_data):
 
 
 def _parse_page_input(page_string: str, max_page: int) -> list[int]:
-    """Parse page input like '1, 3, 5-7' into a list of page numbers."""
+    """
+    Parse page input like '1, 3, 5-7' into a list of page numbers.
+    
+    Pages keep the order they are given in and may repeat, so '5, 1, 1, 3'
+    reorders and duplicates pages; a range like '7-5' runs backwards.
+    """
     pages = []
     parts = page_string.replace(" ", "").split(",")
     
@@ -479,14 +450,12 @@ def _parse_page_input(page_string: str, max_page: int) -> list[int]:
         if "-" in part:
             start, end = part.split("-", 1)
             start, end = int(start), int(end)
-            if start > end:
-                start, end = end, start
-            pages.extend(range(start, end + 1))
+            step = 1 if start <= end else -1
+            pages.extend(range(start, end + step, step))
         else:
             pages.append(int(part))
     
-    pages = sorted(set(pages))
-    invalid = [p for p in pages if p < 1 or p > max_page]
+    invalid = sorted({p for p in pages if p < 1 or p > max_page})
     if invalid:
         raise ValueError(f"Invalid page numbers: {invalid}. Document has {max_page} pages.")
     
@@ -495,6 +464,8 @@ def _parse_page_input(page_string: str, max_page: int) -> list[int]:
 
 @callback(
     Output("split-result", "children"),
+    Output("split-job", "data"),
+    Output("split-job-poll", "disabled"),
     Input("split-btn", "n_clicks"),
     State("split-file-store", "data"),
     State("split-mode", "value"),
@@ -505,75 +476,136 @@ def _parse_page_input(page_string: str, max_page: int) -> list[int]:
     prevent_initial_call=True,
 )
 def split_pdf(n_clicks, file_data, mode, start_page, end_page, pages_input, every_n):
-    """Execute PDF split."""
+    """Queue a PDF split."""
     if not n_clicks or not file_data:
         raise PreventUpdate
     
+    stem = Path(file_data["name"]).stem
+    page_count = file_data["page_count"]
+    
     try:
-        with tempfile.TemporaryDirectory() as tmp_dir:
-            tmp_path = Path(tmp_dir)
-            
-            input_path = tmp_path / file_data["name"]
-            input_path.write_bytes(base64.b64decode(file_data["content"]))
-            
-            page_count = file_data["page_count"]
-            output_files = []
-            
-            if mode == "range":
-                start = int(start_page) if start_page else 1
-                end = int(end_page) if end_page else page_count
-                output_files = pdf_tool.split_by_ranges(input_path, tmp_path, [(start, end)])
-            
-            elif mode == "pages":
-                if not pages_input:
-                    return create_error_alert("Please enter page numbers to extract.")
-                pages = _parse_page_input(pages_input, page_count)
-                output_name = f"{input_path.stem}_extracted.pdf"
-                output_files = [pdf_tool.extract_pages(input_path, tmp_path / output_name, pages)]
-            
-            elif mode == "every_n":
-                n = int(every_n) if every_n else 1
-                output_files = pdf_tool.split_every_n_pages(input_path, tmp_path, n)
-            
-            # Single file - direct download
-            if len(output_files) == 1:
-                result_bytes = output_files[0].read_bytes()
-                result_b64 = base64.b64encode(result_bytes).decode()
-                output_name = output_files[0].name
-                
-                return html.Div([
-                    create_success_alert("✓ PDF split successfully!"),
-                    create_download_button(
-                        f"data:application/pdf;base64,{result_b64}",
-                        output_name,
-                        f"Download {output_name}"
-                    ),
-                ])
-            
-            # Multiple files - create ZIP
-            zip_path = tmp_path / f"{input_path.stem}_split.zip"
-            with zipfile.ZipFile(zip_path, "w") as zf:
-                for output_file in output_files:
-                    zf.write(output_file, output_file.name)
-            
-            zip_bytes = zip_path.read_bytes()
-            zip_b64 = base64.b64encode(zip_bytes).decode()
-            
-            file_list = html.Ul([
-                html.Li(f.name, style={"color": "#d6d3d1"}) for f in output_files
-            ], style={"marginTop": "0.5rem", "marginBottom": "1rem"})
-            
-            return html.Div([
-                create_success_alert(f"✓ Created {len(output_files)} files!"),
-                file_list,
-                create_download_button(
-                    f"data:application/zip;base64,{zip_b64}",
-                    f"{input_path.stem}_split.zip",
-                    "Download All (ZIP)"
-                ),
-            ])
+        if mode == "range":
+            start = int(start_page) if start_page else 1
+            end = int(end_page) if end_page else page_count
+            params = {"start": start, "end": end}
+        
+        elif mode == "pages":
+            if not pages_input:
+                return create_error_alert("Please enter page numbers to extract."), None, True
+            params = {"pages": _parse_page_input(pages_input, page_count)}
+        
+        elif mode == "every_n":
+            params = {"every_n": int(every_n) if every_n else 1}
+        
+        else:
+            raise PreventUpdate
+        
+        source = upload_store.get(file_data["id"])
+        job_id = job_manager.submit(split_job, source, stem, mode, params)
+    
+    except KeyError:
+        return create_error_alert(_EXPIRED_MESSAGE), None, True
+    except (ValueError, QueueFullError) as e:
+        return create_error_alert(f"Error: {str(e)}"), None, True
+    
+    return create_job_progress("split", _QUEUED_LABEL), {"id": job_id}, False
+
+
+def _render_split_result(job: dict, result: dict) -> html.Div:
+    files = result["files"]
+    
+    # Single file - direct download
+    if len(files) == 1:
+        return html.Div([
+            create_success_alert("✓ PDF split successfully!"),
+            create_download_button(
+                download_url(result["blob_id"], result["name"]),
+                result["name"],
+                f"Download {result['name']}"
+            ),
+        ])
+    
+    # Multiple files - bundled as ZIP by the job
+    file_list = html.Ul([
+        html.Li(name, style={"color": "#d6d3d1"}) for name in files
+    ], style={"marginTop": "0.5rem", "marginBottom": "1rem"})
     
-    except ValueError as e:
-        return create_error_alert(f"Error: {str(e)}")
-    except Exception as e:
-        return create_error_alert(f"Error splitting PDF: {str(e)}")
+    return html.Div([
+        create_success_alert(f"✓ Created {len(files)} files!"),
+        file_list,
+        create_download_button(
+            download_url(result["blob_id"], result["name"]),
+            result["name"],
+            "Download All (ZIP)"
+        ),
+    ])
+
+
+# =============================================================================
+# Background Job Callbacks
+# =============================================================================
+
+_JOB_LABELS = {
+    "merge": ("Merging…", "Error merging PDFs"),
+    "compress": ("Compressing…", "Error compressing PDF"),
+    "split": ("Splitting…", "Error splitting PDF"),
+}
+
+_JOB_RENDERERS = {
+    "merge": _render_merge_result,
+    "compress": _render_compress_result,
+    "split": _render_split_result,
+}
+
+
+def _register_job_callbacks(prefix: str) -> None:
+    """Register the progress polling and cancel callbacks for one tab."""
+    
+    @callback(
+        Output(f"{prefix}-result", "children", allow_duplicate=True),
+        Output(f"{prefix}-job-poll", "disabled", allow_duplicate=True),
+        Input(f"{prefix}-job-poll", "n_intervals"),
+        State(f"{prefix}-job", "data"),
+        prevent_initial_call=True,
+    )
+    def poll_job(n_intervals, job):
+        if not job:
+            return no_update, True
+        
+        status = job_manager.status(job["id"])
+        label, error_prefix = _JOB_LABELS[prefix]
+        
+        if status is None:
+            return create_error_alert("This job has expired. Please run it again."), True
+        if status["status"] == "queued":
+            return create_job_progress(prefix, _QUEUED_LABEL), False
+        if status["status"] == "running":
+            return create_job_progress(
+                prefix,
+                label,
+                status.get("done"),
+                status.get("total"),
+                status.get("stage"),
+                status.get("bytes_saved", 0),
+            ), False
+        if status["status"] == "cancelled":
+            return create_error_alert("Cancelled."), True
+        if status["status"] == "failed":
+            return create_error_alert(f"{error_prefix}: {status['error']}"), True
+        return _JOB_RENDERERS[prefix](job, status["result"]), True
+    
+    @callback(
+        Output(f"{prefix}-cancel-btn", "disabled"),
+        Input(f"{prefix}-cancel-btn", "n_clicks"),
+        State(f"{prefix}-job", "data"),
+        prevent_initial_call=True,
+    )
+    def cancel_job(n_clicks, job):
+        if not n_clicks or not job:
+            raise PreventUpdate
+        job_manager.cancel(job["id"])
+        return True
+
+
+for _prefix in _JOB_RENDERERS:
+    _register_job_callbacks(_prefix)
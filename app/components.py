@@ -6,21 +6,27 @@ import dash_bootstrap_components as dbc
 from .config import COMPRESSION_OPTIONS
 
 
-def create_upload_component(component_id: str, multiple: bool = False) -> dcc.Upload:
-    """Create a styled upload component."""
-    return dcc.Upload(
-        id=component_id,
-        children=html.Div([
+def create_upload_component(component_id: str, multiple: bool = False) -> html.Div:
+    """Create a styled upload component.
+
+    Files are sent in chunks to the /upload route by the script in the index
+    template, which then writes the stored files' metadata to the
+    "<component_id>-complete" store.
+    """
+    return html.Div([
+        html.Div([
             html.Div("📄", className="upload-icon"),
             html.Div([
                 "Drop PDF file(s) here or ",
                 html.Span("click to browse", style={"color": "#f59e0b", "fontWeight": "500"}),
             ], className="upload-text"),
-        ]),
-        className="upload-area",
-        multiple=multiple,
-        accept=".pdf",
-    )
+            html.Div(id=f"{component_id}-status", className="upload-status"),
+        ], id=component_id, className="upload-area", **{
+            "data-upload": component_id,
+            "data-multiple": "true" if multiple else "false",
+        }),
+        dcc.Store(id=f"{component_id}-complete"),
+    ])
 
 
 def create_file_list(files: list, show_reorder: bool = False, id_prefix: str = "") -> html.Div:
@@ -149,3 +155,39 @@ def create_download_button(href: str, filename: str, text: str = "Download") ->
         className="btn-download",
         style={"marginTop": "1rem", "display": "inline-block"},
     )
+
+
+def create_job_tracker(prefix: str, poll_interval_ms: int) -> html.Div:
+    """Create the result area, job store and poll timer for a background job."""
+    return html.Div([
+        html.Div(id=f"{prefix}-result"),
+        dcc.Store(id=f"{prefix}-job"),
+        dcc.Interval(id=f"{prefix}-job-poll", interval=poll_interval_ms, disabled=True),
+    ])
+
+
+def create_job_progress(
+    prefix: str,
+    label: str,
+    done: int | None = None,
+    total: int | None = None,
+    stage: str | None = None,
+    bytes_saved: int = 0,
+) -> html.Div:
+    """Create a progress bar with a cancel button for a running job."""
+    if total:
+        value = 100 * done / total
+        text = f"{label} {done}/{total} {stage or ''}".rstrip()
+        if bytes_saved > 0:
+            text += f" · {bytes_saved / 1024:.1f} KB saved"
+        bar = dbc.Progress(value=value, color="warning", style={"height": "0.75rem"})
+    else:
+        text = label
+        bar = dbc.Progress(value=100, color="warning", striped=True, animated=True, style={"height": "0.75rem"})
+
+    return html.Div([
+        html.Div(text, className="compression-desc", style={"marginBottom": "0.5rem"}),
+        bar,
+        html.Button("Cancel", id=f"{prefix}-cancel-btn", className="btn-primary-custom",
+                    style={"marginTop": "1rem"}),
+    ], style={"marginTop": "1rem"})
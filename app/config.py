@@ -1,7 +1,29 @@
 """Configuration constants for the Priva PDF application."""
 
+import os
+import tempfile
+from pathlib import Path
+
 from src.pdf_compressor import CompressionLevel
 
+# Server-side storage for uploaded files, in a directory of the user's own
+# since it holds their documents
+STORAGE_DIR = Path(tempfile.gettempdir()) / (f"priva_pdf-{os.getuid()}" if hasattr(os, "getuid") else "priva_pdf")
+UPLOAD_SPOOL_THRESHOLD = 8 * 1024 * 1024  # Larger uploads are kept on disk
+UPLOAD_TTL_SECONDS = 60 * 60
+UPLOAD_CHUNK_SIZE = 4 * 1024 * 1024  # Size of each part of a chunked upload
+UPLOAD_MAX_BYTES = 4 * 1024 * 1024 * 1024
+
+# Server-side storage for processed files served by the download route
+RESULT_SPOOL_THRESHOLD = 8 * 1024 * 1024
+RESULT_TTL_SECONDS = 15 * 60
+
+# Background jobs
+JOB_WORKERS = max(1, (os.cpu_count() or 2) // 2)
+JOB_MAX_PENDING = 16  # Queued plus running jobs before new ones are rejected
+JOB_POLL_INTERVAL_MS = 500
+MERGE_BATCH_SIZE = 25  # Inputs merged between flushes to disk, bounds worker memory
+
 # Compression level options for dropdowns
 COMPRESSION_OPTIONS = [
     {"label": "Low", "value": "LOW"},
@@ -0,0 +1,235 @@
+"""Background job queue for long-running PDF operations."""
+
+import io
+import multiprocessing
+import threading
+import time
+import uuid
+import zipfile
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from src.pdf_compressor import CompressionLevel
+from src.pdf_tool import PdfTool
+from src.progress import CancelToken, OperationCancelled, ProgressEvent
+from .config import JOB_MAX_PENDING, JOB_WORKERS, MERGE_BATCH_SIZE, RESULT_TTL_SECONDS
+from .storage import result_store
+
+
+class QueueFullError(Exception):
+    """Raised when too many jobs are already queued or running."""
+
+
+class _JobProgress:
+    """Progress callback publishing events through a manager dict shared with the web process."""
+
+    def __init__(self, job_id: str, progress):
+        self._job_id = job_id
+        self._progress = progress
+
+    def __call__(self, event: ProgressEvent) -> None:
+        self._progress[self._job_id] = event
+
+
+class _JobCancelToken(CancelToken):
+    """Cancel token reading cancellation requests from a shared manager dict.
+
+    A running job stops at the next page, image or file it processes.
+    """
+
+    def __init__(self, job_id: str, cancelled):
+        super().__init__()
+        self._job_id = job_id
+        self._cancelled_jobs = cancelled
+
+    @property
+    def cancelled(self) -> bool:
+        return self._job_id in self._cancelled_jobs
+
+
+class JobManager:
+    """
+    Runs PDF operations in a local process pool.
+
+    Jobs are identified by a random ID; callbacks submit a job, return
+    immediately and poll status() until the job is finished. Results are put
+    into the result store. At most max_pending jobs may be queued or running
+    at once.
+
+    Jobs live in the memory of the web process, so the app must be served by
+    a single process (with any number of threads).
+    """
+
+    def __init__(self, max_workers: int, max_pending: int):
+        self._max_workers = max_workers
+        self._max_pending = max_pending
+        self._executor: ProcessPoolExecutor | None = None
+        self._manager = None
+        self._progress = None
+        self._cancelled = None
+        self._jobs: dict[str, dict] = {}
+        self._futures: dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, fn, *args) -> str:
+        """
+        Queue fn(*args, progress=..., cancel=...) to run in a worker process.
+
+        fn must be a module-level function returning a dict with the result
+        file's "name" and "data", plus any extra fields to keep in the status.
+
+        Raises:
+            QueueFullError: If max_pending jobs are already queued or running
+        """
+        with self._lock:
+            self._evict_finished()
+            active = sum(1 for job in self._jobs.values() if job["status"] in ("queued", "running"))
+            if active >= self._max_pending:
+                raise QueueFullError("Too many jobs are running. Please try again in a moment.")
+
+            if self._manager is None:
+                self._manager = multiprocessing.Manager()
+                self._progress = self._manager.dict()
+                self._cancelled = self._manager.dict()
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self._max_workers)
+
+            job_id = uuid.uuid4().hex
+            self._jobs[job_id] = {"status": "queued", "finished_at": None}
+            progress = _JobProgress(job_id, self._progress)
+            cancel = _JobCancelToken(job_id, self._cancelled)
+            executor = self._executor
+            future = executor.submit(fn, *args, progress=progress, cancel=cancel)
+            self._futures[job_id] = future
+
+        future.add_done_callback(lambda f: self._finish(job_id, executor, f))
+        return job_id
+
+    def status(self, job_id: str) -> dict | None:
+        """
+        Current state of a job, or None if it is unknown or has expired.
+
+        The dict has a "status" of queued, running, done, failed or
+        cancelled, "stage", "done", "total" and "bytes_saved" once the job
+        reports progress (see ProgressEvent), and when finished either the "result" (with the stored
+        file's "blob_id") or an "error".
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            job = dict(job)
+            future = self._futures.get(job_id)
+
+        if job["status"] == "queued" and future is not None and future.running():
+            job["status"] = "running"
+            event = self._progress.get(job_id)
+            if event is not None:
+                job.update(stage=event.stage, done=event.done, total=event.total, bytes_saved=event.bytes_saved)
+        return job
+
+    def cancel(self, job_id: str) -> None:
+        """Cancel a queued job, or ask a running one to stop."""
+        with self._lock:
+            future = self._futures.get(job_id)
+            if future is None:
+                return
+            if not future.cancel():
+                self._cancelled[job_id] = True
+
+    def _finish(self, job_id: str, executor: ProcessPoolExecutor, future: Future) -> None:
+        update = {"finished_at": time.time()}
+        if future.cancelled():
+            update["status"] = "cancelled"
+        else:
+            try:
+                result = future.result()
+            except OperationCancelled:
+                update["status"] = "cancelled"
+            except BrokenProcessPool as e:
+                # A worker died (e.g. killed for memory); start a fresh pool
+                # for the next job. Every job of the pool fails this way, and
+                # only the first one replaces it.
+                with self._lock:
+                    if self._executor is executor:
+                        executor.shutdown(wait=False, cancel_futures=True)
+                        self._executor = None
+                update["status"] = "failed"
+                update["error"] = str(e)
+            except Exception as e:
+                update["status"] = "failed"
+                update["error"] = str(e)
+            else:
+                data = result.pop("data")
+                result["blob_id"] = result_store.put(data)
+                result["size"] = len(data)
+                update["status"] = "done"
+                update["result"] = result
+
+        with self._lock:
+            self._jobs[job_id].update(update)
+            self._futures.pop(job_id, None)
+            self._progress.pop(job_id, None)
+            self._cancelled.pop(job_id, None)
+
+    def _evict_finished(self) -> None:
+        cutoff = time.time() - RESULT_TTL_SECONDS
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job["finished_at"] is not None and job["finished_at"] < cutoff
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+
+# =============================================================================
+# Job Functions (run in worker processes)
+# =============================================================================
+
+def merge_job(sources: list, output_name: str, progress=None, cancel=None) -> dict:
+    """
+    Merge uploaded PDFs, keeping one copy of resources the uploads have in
+    common. Merges of more than MERGE_BATCH_SIZE uploads stream through a
+    work file, so they fit in memory; smaller ones never touch the disk.
+    """
+    data = PdfTool().merge(sources, None, progress, cancel, batch_size=MERGE_BATCH_SIZE, deduplicate=True)
+    return {"name": output_name, "data": data}
+
+
+def compress_job(source, level_name: str, output_name: str, progress=None, cancel=None) -> dict:
+    """Compress an uploaded PDF."""
+    level = CompressionLevel[level_name]
+    data = PdfTool().compress(source, None, level, progress=progress, cancel=cancel)
+    return {"name": output_name, "data": data}
+
+
+def split_job(source, stem: str, mode: str, params: dict, progress=None, cancel=None) -> dict:
+    """
+    Split an uploaded PDF.
+
+    A single output file is returned as is, several are bundled in a ZIP.
+    """
+    tool = PdfTool()
+
+    if mode == "range":
+        output_files = tool.split_by_ranges(source, None, [(params["start"], params["end"])], stem, progress, cancel)
+    elif mode == "pages":
+        output_name = f"{stem}_extracted.pdf"
+        output_files = [(output_name, tool.extract_pages(source, None, params["pages"], progress, cancel))]
+    else:
+        output_files = tool.split_every_n_pages(source, None, params["every_n"], stem, progress, cancel)
+
+    names = [name for name, _ in output_files]
+    if len(output_files) == 1:
+        name, data = output_files[0]
+        return {"name": name, "data": data, "files": names}
+
+    zip_buffer = io.BytesIO()
+    with zipfile.ZipFile(zip_buffer, "w") as zf:
+        for name, data in output_files:
+            zf.writestr(name, data)
+
+    return {"name": f"{stem}_split.zip", "data": zip_buffer.getvalue(), "files": names}
+
+
+job_manager = JobManager(JOB_WORKERS, JOB_MAX_PENDING)
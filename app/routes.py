@@ -0,0 +1,94 @@
+"""Flask routes served alongside the Dash application."""
+
+from io import BytesIO
+from pathlib import Path
+from urllib.parse import urlencode
+
+from flask import Flask, abort, jsonify, request, send_file
+
+from src.pdf_tool import PdfTool
+from .config import RESULT_TTL_SECONDS
+from .storage import chunked_uploads, result_store, upload_store
+
+pdf_tool = PdfTool()
+
+
+def download_url(blob_id: str, filename: str) -> str:
+    """Build the URL under which a stored result can be downloaded."""
+    return f"/download/{blob_id}?{urlencode({'name': filename})}"
+
+
+def register_routes(server: Flask) -> None:
+    """Register the upload and download routes on the Dash Flask server."""
+
+    @server.route("/upload", methods=["POST"])
+    def upload_start():
+        payload = request.get_json(silent=True) or {}
+        try:
+            upload_id = chunked_uploads.start(str(payload["name"]), int(payload["size"]))
+        except (KeyError, TypeError, ValueError) as e:
+            return jsonify(error=str(e)), 400
+        return jsonify(upload_id=upload_id, chunk_size=chunked_uploads.chunk_size, offset=0)
+
+    @server.route("/upload/<upload_id>", methods=["GET"])
+    def upload_status(upload_id: str):
+        try:
+            return jsonify(offset=chunked_uploads.offset(upload_id))
+        except KeyError:
+            abort(404)
+
+    @server.route("/upload/<upload_id>", methods=["PUT"])
+    def upload_part(upload_id: str):
+        offset = request.args.get("offset", type=int)
+        if offset is None:
+            return jsonify(error="Missing offset"), 400
+        try:
+            new_offset = chunked_uploads.append(upload_id, offset, request.stream)
+        except KeyError:
+            abort(404)
+        except ValueError as e:
+            # Tell the client where to resume from.
+            return jsonify(error=str(e), offset=chunked_uploads.offset(upload_id)), 409
+        return jsonify(offset=new_offset)
+
+    @server.route("/upload/<upload_id>/complete", methods=["POST"])
+    def upload_complete(upload_id: str):
+        try:
+            blob_id, name, size = chunked_uploads.finish(upload_id)
+        except KeyError:
+            abort(404)
+        except ValueError as e:
+            return jsonify(error=str(e), offset=chunked_uploads.offset(upload_id)), 409
+
+        try:
+            page_count = pdf_tool.get_page_count(upload_store.get(blob_id))
+        except Exception:
+            page_count = None
+
+        return jsonify(id=blob_id, name=name, size=size, page_count=page_count)
+
+    @server.route("/download/<blob_id>")
+    def download(blob_id: str):
+        try:
+            content = result_store.get(blob_id)
+        except KeyError:
+            abort(404)
+
+        filename = request.args.get("name", "download.pdf")
+        mimetype = "application/zip" if filename.lower().endswith(".zip") else "application/pdf"
+        if not isinstance(content, Path):
+            content = BytesIO(content)
+
+        # send_file streams the body in chunks and, with conditional=True,
+        # sets Content-Length and answers Range requests.
+        response = send_file(
+            content,
+            mimetype=mimetype,
+            as_attachment=True,
+            download_name=filename,
+            conditional=True,
+            etag=blob_id,
+            max_age=RESULT_TTL_SECONDS,
+        )
+        response.cache_control.private = True
+        return response
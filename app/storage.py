@@ -0,0 +1,326 @@
+"""Server-side storage for uploaded and generated files."""
+
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import BinaryIO
+
+from src.pdf_io import make_private_dir
+from .config import (
+    RESULT_SPOOL_THRESHOLD,
+    RESULT_TTL_SECONDS,
+    STORAGE_DIR,
+    UPLOAD_CHUNK_SIZE,
+    UPLOAD_MAX_BYTES,
+    UPLOAD_SPOOL_THRESHOLD,
+    UPLOAD_TTL_SECONDS,
+)
+
+_BLOB_ID = re.compile(r"^[0-9a-f]{64}$")
+_UPLOAD_ID = re.compile(r"^[0-9a-f]{32}$")
+_COPY_BUFFER_SIZE = 64 * 1024
+
+
+class BlobStore:
+    """
+    Content-addressed blob store with TTL eviction.
+
+    Blobs are identified by the SHA-256 of their content, so Dash stores only
+    need to carry the ID. Small blobs are kept in memory, larger ones are
+    spooled to disk. A blob expires once it has not been accessed for
+    ttl_seconds.
+
+    In-memory blobs are private to the process; when running several server
+    processes, set spool_threshold to 0 so every blob lives on disk.
+    """
+
+    def __init__(self, directory: Path, spool_threshold: int, ttl_seconds: int, suffix: str = ".bin"):
+        self._directory = directory
+        self._suffix = suffix
+        self._spool_threshold = spool_threshold
+        self._ttl = ttl_seconds
+        self._memory: dict[str, tuple[bytes, float]] = {}
+        self._lock = threading.Lock()
+        self._next_disk_sweep = 0.0
+
+    def put(self, data: bytes) -> str:
+        """Store data and return its ID."""
+        blob_id = hashlib.sha256(data).hexdigest()
+
+        with self._lock:
+            self._evict_expired()
+            now = time.time()
+
+            if blob_id in self._memory:
+                self._memory[blob_id] = (self._memory[blob_id][0], now)
+            elif len(data) > self._spool_threshold:
+                path = self._path(blob_id)
+                if path.exists():
+                    os.utime(path)
+                else:
+                    self._write(path, data)
+            else:
+                self._memory[blob_id] = (bytes(data), now)
+
+        return blob_id
+
+    def put_file(self, path: Path) -> str:
+        """
+        Move a file into the store and return its ID.
+
+        The file is hashed in chunks and, if it is above the spool threshold,
+        renamed into place, so large files are never loaded into memory. The
+        file must be on the same filesystem as the store directory.
+        """
+        digest = hashlib.sha256()
+        with path.open("rb") as f:
+            while chunk := f.read(_COPY_BUFFER_SIZE):
+                digest.update(chunk)
+        blob_id = digest.hexdigest()
+        size = path.stat().st_size
+
+        with self._lock:
+            self._evict_expired()
+
+            if blob_id in self._memory:
+                self._memory[blob_id] = (self._memory[blob_id][0], time.time())
+                path.unlink()
+            elif size > self._spool_threshold:
+                make_private_dir(self._directory)
+                os.replace(path, self._path(blob_id))
+            else:
+                self._memory[blob_id] = (path.read_bytes(), time.time())
+                path.unlink()
+
+        return blob_id
+
+    def get(self, blob_id: str) -> bytes | Path:
+        """
+        Resolve an ID to the stored content.
+
+        Returns:
+            The bytes of an in-memory blob, or the path of a spooled one
+
+        Raises:
+            KeyError: If the blob does not exist or has expired
+        """
+        if not _BLOB_ID.match(blob_id):
+            raise KeyError(blob_id)
+
+        with self._lock:
+            self._evict_expired()
+
+            if blob_id in self._memory:
+                data, _ = self._memory[blob_id]
+                self._memory[blob_id] = (data, time.time())
+                return data
+
+            path = self._path(blob_id)
+            try:
+                os.utime(path)
+            except FileNotFoundError:
+                raise KeyError(blob_id) from None
+            return path
+
+    def size(self, blob_id: str) -> int:
+        content = self.get(blob_id)
+        if isinstance(content, Path):
+            return content.stat().st_size
+        return len(content)
+
+    def _path(self, blob_id: str) -> Path:
+        return self._directory / f"{blob_id}{self._suffix}"
+
+    def _write(self, path: Path, data: bytes) -> None:
+        make_private_dir(self._directory)
+        # mkstemp creates the file readable by the current user only.
+        fd, tmp_name = tempfile.mkstemp(dir=self._directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as tmp:
+                tmp.write(data)
+            os.replace(tmp_name, path)
+        except BaseException:
+            Path(tmp_name).unlink(missing_ok=True)
+            raise
+
+    def _evict_expired(self) -> None:
+        now = time.time()
+        cutoff = now - self._ttl
+
+        expired = [blob_id for blob_id, (_, accessed) in self._memory.items() if accessed < cutoff]
+        for blob_id in expired:
+            del self._memory[blob_id]
+
+        # Spooled files are swept at most once a minute.
+        if now < self._next_disk_sweep:
+            return
+        self._next_disk_sweep = now + 60
+
+        if not self._directory.exists():
+            return
+        for path in self._directory.iterdir():
+            try:
+                if path.stat().st_mtime < cutoff:
+                    path.unlink()
+            except FileNotFoundError:
+                pass
+
+
+class ChunkedUploads:
+    """
+    Resumable uploads assembled from fixed-size parts.
+
+    Each part is appended to a partial file on disk at the offset the client
+    sends; a part at the wrong offset is rejected so the client can ask for
+    the current offset and resume from there. Completed uploads are moved
+    into a BlobStore. Partial uploads not touched for ttl_seconds are removed.
+    """
+
+    def __init__(self, directory: Path, store: BlobStore, chunk_size: int, max_bytes: int, ttl_seconds: int):
+        self._directory = directory
+        self._store = store
+        self._chunk_size = chunk_size
+        self._max_bytes = max_bytes
+        self._ttl = ttl_seconds
+        self._locks: dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+
+    @property
+    def chunk_size(self) -> int:
+        return self._chunk_size
+
+    def start(self, name: str, size: int) -> str:
+        """Begin an upload and return its ID."""
+        if size < 0 or size > self._max_bytes:
+            raise ValueError(f"File too large: {size} bytes (maximum is {self._max_bytes} bytes)")
+
+        self._evict_expired()
+        make_private_dir(self._directory)
+
+        upload_id = uuid.uuid4().hex
+        with _create_private(self._meta_path(upload_id)) as meta:
+            meta.write(json.dumps({"name": name, "size": size}).encode())
+        # The part file is moved into the blob store as is, keeping its mode.
+        _create_private(self._part_path(upload_id)).close()
+        return upload_id
+
+    def offset(self, upload_id: str) -> int:
+        """Number of bytes received so far."""
+        try:
+            return self._part_path(upload_id).stat().st_size
+        except FileNotFoundError:
+            raise KeyError(upload_id) from None
+
+    def append(self, upload_id: str, offset: int, stream: BinaryIO) -> int:
+        """
+        Append one part read from stream.
+
+        Returns:
+            The new offset
+
+        Raises:
+            KeyError: If the upload does not exist
+            ValueError: If offset is not the current offset, or the part is
+                larger than the chunk size or the declared file size
+        """
+        meta = self._meta(upload_id)
+
+        with self._upload_lock(upload_id):
+            current = self.offset(upload_id)
+            if offset != current:
+                raise ValueError(f"Expected offset {current}, got {offset}")
+
+            limit = min(self._chunk_size, meta["size"] - current)
+            written = 0
+            with self._part_path(upload_id).open("ab") as part:
+                try:
+                    while chunk := stream.read(_COPY_BUFFER_SIZE):
+                        written += len(chunk)
+                        if written > limit:
+                            raise ValueError("Part exceeds the chunk size or the declared file size")
+                        part.write(chunk)
+                except ValueError:
+                    part.truncate(current)
+                    raise
+            os.utime(self._meta_path(upload_id))
+
+        return current + written
+
+    def finish(self, upload_id: str) -> tuple[str, str, int]:
+        """
+        Move a fully received upload into the blob store.
+
+        Returns:
+            Tuple of (blob_id, name, size)
+        """
+        meta = self._meta(upload_id)
+
+        with self._upload_lock(upload_id):
+            received = self.offset(upload_id)
+            if received != meta["size"]:
+                raise ValueError(f"Upload incomplete: received {received} of {meta['size']} bytes")
+
+            blob_id = self._store.put_file(self._part_path(upload_id))
+            self._meta_path(upload_id).unlink(missing_ok=True)
+
+        with self._locks_guard:
+            self._locks.pop(upload_id, None)
+
+        return blob_id, meta["name"], meta["size"]
+
+    def _upload_lock(self, upload_id: str) -> threading.Lock:
+        # One lock per upload, so slow clients do not block each other.
+        with self._locks_guard:
+            return self._locks.setdefault(upload_id, threading.Lock())
+
+    def _meta(self, upload_id: str) -> dict:
+        try:
+            return json.loads(self._meta_path(upload_id).read_text())
+        except FileNotFoundError:
+            raise KeyError(upload_id) from None
+
+    def _part_path(self, upload_id: str) -> Path:
+        if not _UPLOAD_ID.match(upload_id):
+            raise KeyError(upload_id)
+        return self._directory / f"{upload_id}.part"
+
+    def _meta_path(self, upload_id: str) -> Path:
+        if not _UPLOAD_ID.match(upload_id):
+            raise KeyError(upload_id)
+        return self._directory / f"{upload_id}.json"
+
+    def _evict_expired(self) -> None:
+        if not self._directory.exists():
+            return
+        cutoff = time.time() - self._ttl
+        for path in self._directory.iterdir():
+            try:
+                if path.stat().st_mtime < cutoff:
+                    path.unlink()
+                    with self._locks_guard:
+                        self._locks.pop(path.stem, None)
+            except FileNotFoundError:
+                pass
+
+
+def _create_private(path: Path) -> BinaryIO:
+    """Create a new file readable and writable by the current user only."""
+    return os.fdopen(os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600), "wb")
+
+
+# Spooled uploads are handed to the PDF tools as paths, which must end in .pdf
+upload_store = BlobStore(STORAGE_DIR / "uploads", UPLOAD_SPOOL_THRESHOLD, UPLOAD_TTL_SECONDS, ".pdf")
+result_store = BlobStore(STORAGE_DIR / "results", RESULT_SPOOL_THRESHOLD, RESULT_TTL_SECONDS)
+chunked_uploads = ChunkedUploads(
+    STORAGE_DIR / "partial",
+    upload_store,
+    UPLOAD_CHUNK_SIZE,
+    UPLOAD_MAX_BYTES,
+    UPLOAD_TTL_SECONDS,
+)
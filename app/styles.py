@@ -83,7 +83,8 @@ body {
     cursor: pointer;
 }
 
-.upload-area:hover {
+.upload-area:hover,
+.upload-area.drag-active {
     border-color: #f59e0b;
     background-color: rgba(245, 158, 11, 0.05);
 }
@@ -98,6 +99,13 @@ body {
     font-size: 0.95rem;
 }
 
+.upload-status {
+    color: #f59e0b;
+    font-size: 0.85rem;
+    margin-top: 0.5rem;
+    min-height: 1.2em;
+}
+
 /* File list */
 .file-list-container {
     background: linear-gradient(135deg, rgba(245, 158, 11, 0.12) 0%, rgba(217, 119, 6, 0.08) 100%);
@@ -725,6 +733,117 @@ def get_index_string() -> str:
             });
         });
         </script>
+        <script>
+        // Chunked, resumable uploads to the /upload route.
+        // Files are sent in fixed-size parts; after a failed part the client
+        // asks the server for the received offset and resumes from there.
+        // The stored files' metadata is handed to Dash via set_props.
+        (function() {
+            const MAX_RETRIES = 5;
+
+            async function request(method, url, body) {
+                const headers = body instanceof Blob
+                    ? {'Content-Type': 'application/octet-stream'}
+                    : {'Content-Type': 'application/json'};
+                const response = await fetch(url, {method, body, headers});
+                const data = await response.json().catch(() => ({}));
+                if (!response.ok) {
+                    throw new Error(data.error || `Upload failed (${response.status})`);
+                }
+                return data;
+            }
+
+            async function uploadFile(file, onProgress) {
+                const started = await request('POST', '/upload', JSON.stringify({name: file.name, size: file.size}));
+                const uploadId = started.upload_id;
+                const chunkSize = started.chunk_size;
+                let offset = 0;
+                let retries = 0;
+
+                while (offset < file.size) {
+                    try {
+                        const part = file.slice(offset, offset + chunkSize);
+                        offset = (await request('PUT', `/upload/${uploadId}?offset=${offset}`, part)).offset;
+                        retries = 0;
+                        onProgress(offset);
+                    } catch (err) {
+                        if (++retries > MAX_RETRIES) throw err;
+                        await new Promise(resolve => setTimeout(resolve, 1000 * retries));
+                        try {
+                            offset = (await request('GET', `/upload/${uploadId}`)).offset;
+                        } catch (statusErr) {
+                            // Keep the current offset and retry the part
+                        }
+                    }
+                }
+
+                return request('POST', `/upload/${uploadId}/complete`);
+            }
+
+            async function handleFiles(area, files) {
+                const componentId = area.dataset.upload;
+                const status = document.getElementById(componentId + '-status');
+
+                files = files.filter(f => f.name.toLowerCase().endsWith('.pdf'));
+                if (area.dataset.multiple !== 'true') files = files.slice(0, 1);
+                if (!files.length) return;
+
+                const uploaded = [];
+                try {
+                    for (const file of files) {
+                        uploaded.push(await uploadFile(file, sent => {
+                            const percent = file.size ? Math.floor(100 * sent / file.size) : 100;
+                            status.textContent = `Uploading ${file.name}… ${percent}%`;
+                        }));
+                    }
+                    status.textContent = '';
+                } catch (err) {
+                    status.textContent = `✗ ${err.message}`;
+                }
+
+                if (uploaded.length) {
+                    window.dash_clientside.set_props(componentId + '-complete', {
+                        data: {files: uploaded, timestamp: Date.now()}
+                    });
+                }
+            }
+
+            function uploadArea(target) {
+                return target.closest ? target.closest('.upload-area[data-upload]') : null;
+            }
+
+            document.addEventListener('click', e => {
+                const area = uploadArea(e.target);
+                if (!area) return;
+                const input = document.createElement('input');
+                input.type = 'file';
+                input.accept = '.pdf';
+                input.multiple = area.dataset.multiple === 'true';
+                input.addEventListener('change', () => handleFiles(area, Array.from(input.files)));
+                input.click();
+            });
+
+            ['dragenter', 'dragover'].forEach(type => document.addEventListener(type, e => {
+                const area = uploadArea(e.target);
+                if (!area) return;
+                e.preventDefault();
+                area.classList.add('drag-active');
+            }));
+
+            document.addEventListener('dragleave', e => {
+                const area = uploadArea(e.target);
+                if (area && !area.contains(e.relatedTarget)) area.classList.remove('drag-active');
+            });
+
+            document.addEventListener('drop', e => {
+                const area = uploadArea(e.target);
+                if (!area) return;
+                e.preventDefault();
+                area.classList.remove('drag-active');
+                handleFiles(area, Array.from(e.dataTransfer.files));
+            });
+        })();
+        </script>
     </body>
 </html>
 '''
@@ -0,0 +1,38 @@
+"""Sample documents and timing helpers shared by the benchmarks."""
+
+import io
+import time
+from pathlib import Path
+
+import fitz
+from PIL import Image
+
+
+def make_sample(path: Path, pages: int, links: bool) -> None:
+    """Write a statement-like PDF: text and a shared logo on every page."""
+    logo = io.BytesIO()
+    Image.new("RGB", (400, 200), (200, 30, 30)).save(logo, "PNG")
+
+    doc = fitz.open()
+    for page_num in range(pages):
+        page = doc.new_page()
+        page.insert_text((72, 72), f"Statement page {page_num + 1} " + "lorem ipsum " * 20)
+        page.insert_image(fitz.Rect(72, 100, 272, 200), stream=logo.getvalue())
+    if links:
+        for page_num in range(pages - 1):
+            doc[page_num].insert_link({
+                "kind": fitz.LINK_GOTO,
+                "from": fitz.Rect(72, 60, 200, 80),
+                "page": page_num + 1,
+            })
+    doc.save(path, garbage=3, deflate=True)
+    doc.close()
+
+
+def best_of(repeats: int, fn, *args) -> float:
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn(*args)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
@@ -0,0 +1,127 @@
+"""
+Benchmark PdfCompressor on mixed content, with and without skipping images
+that cannot shrink.
+
+The sample mixes images worth recompressing (high quality photos) with ones
+that are not: low quality JPEGs, small icons, 1-bit scans and flat charts.
+Previously every image was decoded, resized and encoded, and the result
+thrown away if it was not smaller. Run from the repository root:
+
+    python -m benchmarks.compress_benchmark --pages 40
+"""
+
+import argparse
+import io
+import random
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+import fitz
+from PIL import Image, ImageDraw, ImageFilter
+
+from src.pdf_compressor import CompressionLevel, PdfCompressor
+from .common import best_of
+
+
+def _photo(seed: int, quality: int) -> bytes:
+    """Photo-like JPEG with optimized Huffman tables: blurred noise in every channel."""
+    channels = [
+        Image.effect_noise((800, 600), 80 + 10 * band).filter(ImageFilter.GaussianBlur(2 + seed % 3 + band))
+        for band in range(3)
+    ]
+    buffer = io.BytesIO()
+    Image.merge("RGB", channels).save(buffer, "JPEG", quality=quality, optimize=True)
+    return buffer.getvalue()
+
+
+def _scan(seed: int) -> bytes:
+    """1-bit page scan with lines of "text"."""
+    rng = random.Random(seed)
+    img = Image.new("1", (1700, 2200), 1)
+    draw = ImageDraw.Draw(img)
+    for line in range(60):
+        x = 150
+        while x < 1500:
+            width = rng.randint(20, 90)
+            draw.rectangle((x, 150 + line * 32, x + width, 170 + line * 32), fill=0)
+            x += width + 15
+    buffer = io.BytesIO()
+    img.save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+def _chart(seed: int) -> bytes:
+    """Flat bar chart."""
+    rng = random.Random(seed)
+    img = Image.new("RGB", (1200, 800), "white")
+    draw = ImageDraw.Draw(img)
+    for bar in range(12):
+        height = rng.randint(100, 700)
+        draw.rectangle((60 + bar * 95, 780 - height, 130 + bar * 95, 780), fill=(30, 90 + bar * 12, 200))
+    buffer = io.BytesIO()
+    img.save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+def _icon(seed: int) -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (32, 32), (seed * 40 % 256, 120, 60)).save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+def make_mixed_sample(path: Path, pages: int) -> None:
+    doc = fitz.open()
+    for page_num in range(pages):
+        page = doc.new_page()
+        kind = page_num % 4
+        if kind == 0:
+            page.insert_image(fitz.Rect(72, 72, 540, 420), stream=_photo(page_num, 92))
+        elif kind == 1:
+            page.insert_image(fitz.Rect(72, 72, 540, 420), stream=_photo(page_num, 30))
+        elif kind == 2:
+            page.insert_image(page.rect, stream=_scan(page_num))
+        else:
+            page.insert_image(fitz.Rect(72, 72, 540, 380), stream=_chart(page_num))
+        for icon in range(3):
+            page.insert_image(fitz.Rect(72 + icon * 40, 740, 100 + icon * 40, 768), stream=_icon(page_num * 3 + icon))
+    doc.save(path, garbage=3, deflate=True)
+    doc.close()
+
+
+def compress(sample: Path, level: CompressionLevel) -> tuple[int, PdfCompressor]:
+    compressor = PdfCompressor(level)
+    return len(compressor.compress(sample.read_bytes(), None)), compressor
+
+
+def compress_without_skipping(sample: Path, level: CompressionLevel) -> tuple[int, PdfCompressor]:
+    with mock.patch("src.pdf_compressor._skip_reason", return_value=None):
+        return compress(sample, level)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=40, help="Pages in the sample document")
+    parser.add_argument("--repeats", type=int, default=3, help="Runs per measurement; the fastest is reported")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        sample = Path(tmp) / "mixed.pdf"
+        make_mixed_sample(sample, args.pages)
+        print(f"sample: {args.pages} pages, {sample.stat().st_size / 1024:.0f}KB")
+
+        print(f"{'level':<8} {'previous':>10} {'current':>10} {'speedup':>8} {'prev size':>10} {'size':>10}  skipped")
+        for level in CompressionLevel:
+            previous = best_of(args.repeats, compress_without_skipping, sample, level)
+            current = best_of(args.repeats, compress, sample, level)
+            previous_size, _ = compress_without_skipping(sample, level)
+            current_size, compressor = compress(sample, level)
+            skipped = ", ".join(f"{count} {reason}" for reason, count in sorted(compressor.stats.skipped.items()))
+            print(
+                f"{level.name:<8} {previous:>9.2f}s {current:>9.2f}s {previous / current:>7.2f}x "
+                f"{previous_size / 1024:>8.0f}KB {current_size / 1024:>8.0f}KB  {skipped}"
+            )
+
+
+if __name__ == "__main__":
+    main()
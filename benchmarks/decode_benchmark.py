@@ -0,0 +1,88 @@
+"""
+Benchmark decoding and downscaling a 12-megapixel JPEG scan per compression
+level.
+
+Compares the previous approach (decode at full resolution, then a LANCZOS
+resize) with draft-mode decoding and the level's resampling filter. Each
+measurement runs in a fresh process so its peak memory can be reported.
+Run from the repository root:
+
+    python -m benchmarks.decode_benchmark
+"""
+
+import argparse
+import io
+import resource
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from PIL import Image, ImageFilter
+
+from src.pdf_compressor import CompressionLevel, _decode_image, _encode_image, _jpeg, _scaled
+
+
+def _phone_scan() -> bytes:
+    """4000x3000 photo-like JPEG at the quality phone cameras use."""
+    channels = [
+        Image.effect_noise((4000, 3000), 60 + 10 * band).filter(ImageFilter.GaussianBlur(3 + band))
+        for band in range(3)
+    ]
+    buffer = io.BytesIO()
+    Image.merge("RGB", channels).save(buffer, "JPEG", quality=92)
+    return buffer.getvalue()
+
+
+def _previous(image_bytes: bytes, quality: int, scale: float) -> int:
+    img = _scaled(_decode_image(image_bytes), scale)
+    return len(_jpeg(img, quality))
+
+
+def _current(image_bytes: bytes, quality: int, scale: float, resample: str) -> int:
+    encoded = _encode_image(image_bytes, quality, scale, resample)
+    return len(encoded.data) if encoded is not None else len(image_bytes)
+
+
+def _measure(fn, *args) -> tuple[float, float, int]:
+    """Seconds and peak memory growth (MB) of one call, in a fresh worker process."""
+    before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    size = fn(*args)
+    seconds = time.perf_counter() - start
+    after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return seconds, (after - before) / 1024, size
+
+
+def measure(fn, *args) -> tuple[float, float, int]:
+    with ProcessPoolExecutor(max_workers=1) as executor:
+        return executor.submit(_measure, fn, *args).result()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeats", type=int, default=3, help="Runs per measurement; the fastest is reported")
+    args = parser.parse_args()
+
+    scan = _phone_scan()
+    print(f"sample: 4000x3000 JPEG, {len(scan) / 1024:.0f}KB")
+    print(
+        f"{'level':<8} {'filter':<9} {'previous':>9} {'current':>9} {'speedup':>8} "
+        f"{'prev peak':>10} {'peak':>8} {'prev size':>10} {'size':>9}"
+    )
+    for level in CompressionLevel:
+        previous = min(
+            (measure(_previous, scan, level.quality, level.scale) for _ in range(args.repeats)),
+            key=lambda run: run[0],
+        )
+        current = min(
+            (measure(_current, scan, level.quality, level.scale, level.resample) for _ in range(args.repeats)),
+            key=lambda run: run[0],
+        )
+        print(
+            f"{level.name:<8} {level.resample:<9} {previous[0]:>8.2f}s {current[0]:>8.2f}s "
+            f"{previous[0] / current[0]:>7.2f}x {previous[1]:>8.0f}MB {current[1]:>6.0f}MB "
+            f"{previous[2] / 1024:>8.0f}KB {current[2] / 1024:>7.0f}KB"
+        )
+
+
+if __name__ == "__main__":
+    main()
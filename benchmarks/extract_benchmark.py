@@ -0,0 +1,70 @@
+"""
+Benchmark PdfSplitter.extract_pages against the previous per-page loop.
+
+The previous implementation called insert_pdf() once per requested page,
+which copied the resources shared between pages (fonts, images) into the
+output again for every page. Run from the repository root:
+
+    python -m benchmarks.extract_benchmark --pages 4000
+"""
+
+import argparse
+import tempfile
+from pathlib import Path
+
+import fitz
+
+from src.pdf_splitter import PdfSplitter
+from .common import best_of, make_sample
+
+
+def extract_previous(path: Path, pages: list[int]) -> bytes:
+    """The per-page loop extract_pages used before."""
+    doc = fitz.open(path)
+    new_doc = fitz.open()
+    for page in pages:
+        new_doc.insert_pdf(doc, from_page=page - 1, to_page=page - 1)
+    data = new_doc.tobytes()
+    new_doc.close()
+    doc.close()
+    return data
+
+
+def extract_current(path: Path, pages: list[int]) -> bytes:
+    return PdfSplitter().extract_pages(path, None, pages)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=4000, help="Pages in the sample document")
+    parser.add_argument("--repeats", type=int, default=3, help="Runs per measurement; the fastest is reported")
+    args = parser.parse_args()
+
+    n = args.pages
+    first = min(200, n)
+    selections = {
+        f"1-{n}": list(range(1, n + 1)),
+        f"{n}-1": list(range(n, 0, -1)),
+        "odd pages": list(range(1, n + 1, 2)),
+        f"first {first}": list(range(1, first + 1)),
+        "5,1,1,3": [5, 1, 1, 3],
+    }
+
+    with tempfile.TemporaryDirectory() as tmp:
+        sample = Path(tmp) / "sample.pdf"
+        make_sample(sample, n, links=False)
+
+        print(f"{'selection':<12} {'previous':>10} {'current':>10} {'speedup':>8} {'prev size':>11} {'size':>11}")
+        for name, pages in selections.items():
+            previous = best_of(args.repeats, extract_previous, sample, pages)
+            current = best_of(args.repeats, extract_current, sample, pages)
+            previous_size = len(extract_previous(sample, pages))
+            current_size = len(extract_current(sample, pages))
+            print(
+                f"{name:<12} {previous:>9.3f}s {current:>9.3f}s {previous / current:>7.2f}x "
+                f"{previous_size / 1024:>9.0f}KB {current_size / 1024:>9.0f}KB"
+            )
+
+
+if __name__ == "__main__":
+    main()
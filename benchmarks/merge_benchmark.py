@@ -0,0 +1,116 @@
+"""
+Benchmark PdfMerger.merge: time and peak memory per merge mode.
+
+Every mode runs in a fresh process, since peak RSS covers the whole process
+lifetime. Run from the repository root:
+
+    python -m benchmarks.merge_benchmark --files 400
+
+Add --dedup to measure the cost and savings of resource deduplication; the
+inputs share a logo and font, as statements from one generator would.
+"""
+
+import argparse
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import fitz
+from PIL import Image
+
+from src.pdf_tool import PdfTool
+
+MODES = ["in-memory", "streaming", "tree-reduce"]
+
+
+def make_inputs(directory: Path, files: int, pages: int) -> list[Path]:
+    """Write statement-like inputs, each page with its own photo and the same logo."""
+    logo = io.BytesIO()
+    Image.frombytes("RGB", (200, 80), os.urandom(200 * 80 * 3)).save(logo, "PNG")
+    paths = []
+    for file_num in range(files):
+        doc = fitz.open()
+        for page_num in range(pages):
+            page = doc.new_page()
+            page.insert_image(fitz.Rect(72, 20, 172, 60), stream=logo.getvalue())
+            page.insert_text((72, 72), f"Statement {file_num + 1}, page {page_num + 1}")
+            photo = io.BytesIO()
+            Image.frombytes("RGB", (300, 300), os.urandom(300 * 300 * 3)).save(photo, "JPEG", quality=80)
+            page.insert_image(fitz.Rect(72, 100, 372, 400), stream=photo.getvalue())
+        path = directory / f"statement_{file_num:05d}.pdf"
+        doc.save(path)
+        doc.close()
+        paths.append(path)
+    return paths
+
+
+def run_mode(mode: str, input_dir: Path, output: Path, batch_size: int, workers: int, dedup: bool) -> None:
+    """Merge in this process and print the result as JSON."""
+    options = {
+        "in-memory": {},
+        "streaming": {"batch_size": batch_size},
+        "tree-reduce": {"workers": workers},
+    }[mode]
+    inputs = sorted(input_dir.glob("*.pdf"))
+    tool = PdfTool()
+    start = time.perf_counter()
+    tool.merge(inputs, output, deduplicate=dedup, **options)
+    elapsed = time.perf_counter() - start
+    print(json.dumps({
+        "seconds": elapsed,
+        "peak_rss_bytes": tool.merge_stats.peak_rss_bytes,
+        "size": output.stat().st_size,
+    }))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=400, help="Number of input files")
+    parser.add_argument("--pages", type=int, default=5, help="Pages per input file")
+    parser.add_argument("--batch-size", type=int, default=25, help="Inputs per flush in streaming mode")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Processes for the tree reduce")
+    parser.add_argument("--dedup", action="store_true", help="Deduplicate resources shared by the inputs")
+    parser.add_argument("--run", choices=MODES, help=argparse.SUPPRESS)
+    parser.add_argument("--input-dir", type=Path, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        run_mode(
+            args.run, args.input_dir, args.input_dir.parent / "merged.pdf", args.batch_size, args.workers, args.dedup
+        )
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        input_dir = Path(tmp) / "inputs"
+        input_dir.mkdir()
+        make_inputs(input_dir, args.files, args.pages)
+
+        print(f"batch size {args.batch_size}, {args.workers} workers" + (", deduplicating" if args.dedup else ""))
+        print(f"{'mode':<12} {'time':>8} {'peak RSS':>10} {'size':>10}")
+        for mode in MODES:
+            completed = subprocess.run(
+                [
+                    sys.executable, "-m", "benchmarks.merge_benchmark",
+                    "--run", mode,
+                    "--input-dir", str(input_dir),
+                    "--batch-size", str(args.batch_size),
+                    "--workers", str(args.workers),
+                    *(["--dedup"] if args.dedup else []),
+                ],
+                capture_output=True,
+                text=True,
+                check=True,
+            )
+            result = json.loads(completed.stdout.strip().splitlines()[-1])
+            peak = result["peak_rss_bytes"]
+            peak_text = f"{peak / (1024 * 1024):.0f}MB" if peak is not None else "n/a"
+            print(f"{mode:<12} {result['seconds']:>7.2f}s {peak_text:>10} {result['size'] / (1024 * 1024):>8.1f}MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Benchmark the optional optimizations on a born-digital document.
+
+The sample has text only: an embedded font with far more glyphs than the
+text uses, a second font no page uses, thumbnails, metadata and an attached
+file, so image recompression alone cannot shrink it. Run from the
+repository root:
+
+    python -m benchmarks.optimize_benchmark --pages 20
+"""
+
+import argparse
+import io
+import tempfile
+import time
+from pathlib import Path
+
+import fitz
+from PIL import Image
+
+from src.pdf_compressor import PdfCompressor
+from src.pdf_optimizer import OptimizeOptions
+
+
+def make_born_digital_sample(path: Path, pages: int) -> None:
+    font = fitz.Font("cjk").buffer
+    thumbnail = io.BytesIO()
+    Image.new("RGB", (100, 140), (220, 220, 220)).save(thumbnail, "JPEG")
+
+    doc = fitz.open()
+    for page_num in range(pages):
+        page = doc.new_page()
+        page.insert_font(fontname="F0", fontbuffer=font)
+        page.insert_font(fontname="F1", fontbuffer=fitz.Font("tiro").buffer)
+        for line in range(45):
+            page.insert_text(
+                (72, 72 + line * 15),
+                f"Section {page_num + 1}.{line + 1}: quarterly figures were in line with the forecast",
+                fontname="F0",
+                fontsize=10,
+            )
+    doc.set_metadata({"title": "Quarterly report", "author": "Finance", "producer": "Report generator"})
+    doc.embfile_add("figures.csv", b"quarter,revenue\n" + b"Q1,100\nQ2,120\n" * 5000)
+    doc.save(path, garbage=3, deflate=True)
+    doc.close()
+
+    doc = fitz.open(path)
+    for page in doc:
+        xref = doc.get_new_xref()
+        doc.update_object(
+            xref,
+            "<< /Type /XObject /Subtype /Image /Width 100 /Height 140 "
+            "/ColorSpace /DeviceRGB /BitsPerComponent 8 /Filter /DCTDecode >>",
+        )
+        doc.update_stream(xref, thumbnail.getvalue(), compress=False)
+        doc.xref_set_key(page.xref, "Thumb", f"{xref} 0 R")
+    doc.saveIncr()
+    doc.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=20, help="Pages in the sample document")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        sample = Path(tmp) / "report.pdf"
+        make_born_digital_sample(sample, args.pages)
+        print(f"sample: {args.pages} pages, {sample.stat().st_size / 1024:.0f}KB")
+
+        print(f"{'mode':<12} {'time':>8} {'size':>10}")
+        for name, optimize in (("images only", None), ("optimize", OptimizeOptions())):
+            compressor = PdfCompressor(optimize=optimize)
+            start = time.perf_counter()
+            size = len(compressor.compress(sample.read_bytes(), None))
+            print(f"{name:<12} {time.perf_counter() - start:>7.2f}s {size / 1024:>8.0f}KB")
+
+        print("saved by optimization:")
+        for name, saved in compressor.stats.optimized.items():
+            print(f"  {name:<18} {saved / 1024:>8.1f}KB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Benchmark output size and time of every save profile, per engine.
+
+Merges many small statements (text, a logo and links on every page, so
+tens of thousands of small objects), splits the result into single pages
+and compresses it, once per profile. Run from the repository root:
+
+    python -m benchmarks.save_profile_benchmark --files 200
+"""
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+from src.pdf_compressor import CompressionLevel
+from src.pdf_io import SAVE_PROFILES
+from src.pdf_tool import PdfTool
+from .common import make_sample
+
+
+def _directory_size(path: Path) -> int:
+    return sum(file.stat().st_size for file in path.iterdir())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=200, help="Statements merged")
+    parser.add_argument("--pages", type=int, default=5, help="Pages per statement")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        inputs = []
+        for idx in range(args.files):
+            path = tmp / f"statement{idx:04d}.pdf"
+            make_sample(path, args.pages, links=True)
+            inputs.append(path)
+        merged = tmp / "merged.pdf"
+        PdfTool().merge(inputs, merged)
+        print(f"sample: {args.files} statements, {args.files * args.pages} pages")
+
+        print(f"{'profile':<9} {'operation':<9} {'time':>8} {'size':>10}")
+        for name, profile in SAVE_PROFILES.items():
+            tool = PdfTool(profile)
+            output = tmp / name
+            output.mkdir()
+            operations = (
+                ("merge", lambda: tool.merge(inputs, output / "merged.pdf"), lambda: (output / "merged.pdf").stat().st_size),
+                ("split", lambda: tool.split_every_n_pages(merged, output / "pages", 1), lambda: _directory_size(output / "pages")),
+                (
+                    "compress",
+                    lambda: tool.compress(merged, output / "compressed.pdf", CompressionLevel.MEDIUM),
+                    lambda: (output / "compressed.pdf").stat().st_size,
+                ),
+            )
+            for operation, run, size in operations:
+                start = time.perf_counter()
+                run()
+                seconds = time.perf_counter() - start
+                print(f"{name:<9} {operation:<9} {seconds:>7.2f}s {size() / 1024:>8.0f}KB")
+
+
+if __name__ == "__main__":
+    main()
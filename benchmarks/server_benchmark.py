@@ -0,0 +1,73 @@
+"""
+Benchmark the per-file cost of compressing through the server.
+
+Compresses the same small file repeatedly: with a fresh "main.py compress"
+process per file, with a fresh "main.py client" process per file, and with
+one PdfClient connection for all files. Run from the repository root:
+
+    python -m benchmarks.server_benchmark --files 20
+"""
+
+import argparse
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from src.client import PdfClient
+from .common import make_sample
+
+MAIN = Path(__file__).resolve().parent.parent / "main.py"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=20, help="Files compressed per mode")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        sample = tmp / "sample.pdf"
+        make_sample(sample, 2, links=False)
+        socket_path = tmp / "server.sock"
+        output = tmp / "out.pdf"
+
+        server = subprocess.Popen(
+            [sys.executable, str(MAIN), "serve", "--socket", str(socket_path), "-j", "1"],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        try:
+            while not socket_path.exists():
+                time.sleep(0.05)
+
+            def run_commands(*command: str) -> float:
+                start = time.perf_counter()
+                for _ in range(args.files):
+                    subprocess.run(
+                        [sys.executable, str(MAIN), *command, str(sample), "-o", str(output)],
+                        stdout=subprocess.DEVNULL,
+                        stderr=subprocess.DEVNULL,
+                        check=True,
+                    )
+                return (time.perf_counter() - start) / args.files
+
+            def run_connection() -> float:
+                start = time.perf_counter()
+                with PdfClient(socket_path) as client:
+                    for _ in range(args.files):
+                        client.request("compress", input=sample, output=output)
+                return (time.perf_counter() - start) / args.files
+
+            print(f"{'mode':<24} {'per file':>10}")
+            print(f"{'main.py compress':<24} {run_commands('compress') * 1000:>8.1f}ms")
+            print(f"{'main.py client compress':<24} {run_commands('client', 'compress', '--socket', str(socket_path)) * 1000:>8.1f}ms")
+            print(f"{'PdfClient connection':<24} {run_connection() * 1000:>8.1f}ms")
+        finally:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Benchmark PdfSplitter.split_every_n_pages against the previous approach.
+
+The previous splitter opened the source once to count its pages, reopened it
+to split, and let insert_pdf() look for links on every copied page. A second
+table compares writing single-page files to disk with one and with several
+worker processes. Run from the repository root:
+
+    python -m benchmarks.split_benchmark --pages 2000 --workers 4
+"""
+
+import argparse
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+import fitz
+
+from src.pdf_splitter import PdfSplitter
+from .common import best_of, make_sample
+
+CHUNK_SIZES = (1, 10, 100)
+
+
+def split_previous(path: Path, pages_per_split: int) -> None:
+    """The splitter before it kept the source open."""
+    doc = fitz.open(path)
+    total_pages = len(doc)
+    doc.close()
+
+    doc = fitz.open(path)
+    for start in range(1, total_pages + 1, pages_per_split):
+        end = min(start + pages_per_split - 1, total_pages)
+        new_doc = fitz.open()
+        new_doc.insert_pdf(doc, from_page=start - 1, to_page=end - 1)
+        new_doc.tobytes()
+        new_doc.close()
+    doc.close()
+
+
+def split_current(path: Path, pages_per_split: int) -> None:
+    PdfSplitter().split_every_n_pages(path, None, pages_per_split)
+
+
+def split_to_disk(path: Path, output_dir: Path, workers: int) -> None:
+    PdfSplitter().split_every_n_pages(path, output_dir, 1, workers=workers)
+    shutil.rmtree(output_dir)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=2000, help="Pages in the sample documents")
+    parser.add_argument("--repeats", type=int, default=3, help="Runs per measurement; the fastest is reported")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Processes for the parallel split")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"{'sample':<12} {'pages/chunk':>11} {'previous':>10} {'current':>10} {'speedup':>8}")
+        for links in (False, True):
+            sample = Path(tmp) / f"sample_{'links' if links else 'plain'}.pdf"
+            make_sample(sample, args.pages, links)
+            for pages_per_split in CHUNK_SIZES:
+                previous = best_of(args.repeats, split_previous, sample, pages_per_split)
+                current = best_of(args.repeats, split_current, sample, pages_per_split)
+                print(
+                    f"{sample.stem[7:]:<12} {pages_per_split:>11} {previous:>9.3f}s {current:>9.3f}s "
+                    f"{previous / current:>7.2f}x"
+                )
+
+        print()
+        print(f"{'single-page files to disk':<26} {'1 worker':>10} {f'{args.workers} workers':>11} {'speedup':>8}")
+        output_dir = Path(tmp) / "out"
+        serial = best_of(args.repeats, split_to_disk, sample, output_dir, 1)
+        parallel = best_of(args.repeats, split_to_disk, sample, output_dir, args.workers)
+        print(f"{sample.stem[7:]:<26} {serial:>9.3f}s {parallel:>10.3f}s {serial / parallel:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
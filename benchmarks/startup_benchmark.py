@@ -0,0 +1,83 @@
+"""
+Benchmark CLI start-up and fail when it regresses.
+
+Runs "main.py --help" in fresh interpreters with -X importtime and reports
+the time spent importing src.cli and its heaviest imports. Exits with
+status 1 if the fastest run exceeds the budget, or if PyMuPDF or Pillow were
+imported at all: commands load them when they first open a PDF or decode an
+image. Run from the repository root:
+
+    python -m benchmarks.startup_benchmark --budget-ms 120
+"""
+
+import argparse
+import subprocess
+import sys
+from pathlib import Path
+
+MAIN = Path(__file__).resolve().parent.parent / "main.py"
+
+# Top-level packages that must not be imported just to show the help
+HEAVY_MODULES = {"fitz", "pymupdf", "PIL"}
+
+
+def import_times(args: list[str]) -> list[tuple[int, str, int]]:
+    """(Nesting depth, module, cumulative microseconds) per import of one fresh run, in completion order."""
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", str(MAIN), *args],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    imports = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        imports.append((depth, name.strip(), int(cumulative)))
+    return imports
+
+
+def cli_imports(imports: list[tuple[int, str, int]]) -> tuple[int, list[tuple[int, str, int]]]:
+    """Cumulative time of src.cli and the imports it triggered (listed before it, nested deeper)."""
+    end = next(idx for idx, (depth, name, _) in enumerate(imports) if name == "src.cli" and depth == 0)
+    start = end
+    while start > 0 and imports[start - 1][0] > 0:
+        start -= 1
+    return imports[end][2], imports[start:end]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--budget-ms", type=float, default=120, help="Maximum import time of src.cli")
+    parser.add_argument("--repeats", type=int, default=5, help="Runs; the fastest is compared to the budget")
+    parser.add_argument("--args", default="--help", help="Command line to start with")
+    args = parser.parse_args()
+
+    runs = [import_times(args.args.split()) for _ in range(args.repeats)]
+    fastest = min(runs, key=lambda imports: cli_imports(imports)[0])
+    cli_us, children = cli_imports(fastest)
+    cli_ms = cli_us / 1000
+
+    print(f"main.py {args.args}: src.cli imported in {cli_ms:.1f}ms (budget {args.budget_ms:.0f}ms)")
+    print("heaviest imports of src.cli:")
+    direct = [(name, us) for depth, name, us in children if depth == 1]
+    for name, us in sorted(direct, key=lambda item: -item[1])[:8]:
+        print(f"  {name:<24} {us / 1000:>7.1f}ms")
+
+    failures = []
+    heavy = sorted({name.split(".")[0] for _, name, _ in fastest} & HEAVY_MODULES)
+    if heavy:
+        failures.append(f"heavy modules imported at start-up: {', '.join(heavy)}")
+    if cli_ms > args.budget_ms:
+        failures.append(f"src.cli import took {cli_ms:.1f}ms, over the {args.budget_ms:.0f}ms budget")
+
+    for failure in failures:
+        print(f"FAIL: {failure}", file=sys.stderr)
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
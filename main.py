@@ -1,5 +1,12 @@
 #!/usr/bin/env python3
-from src.cli import main
+import sys
 
 if __name__ == "__main__":
-    main()
+    if sys.argv[1:2] == ["client"]:
+        # Requests to a running server skip loading the CLI, PyMuPDF and
+        # Pillow, which would cost more than the request itself.
+        from src.client import main
+        main(sys.argv[2:])
+    else:
+        from src.cli import main
+        main()
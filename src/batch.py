@@ -0,0 +1,320 @@
+import glob
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import as_completed
+from dataclasses import asdict, dataclass, field
+from enum import Enum
+from pathlib import Path
+from typing import Iterator
+
+from .pdf_compressor import CompressionLevel
+from .pdf_tool import PdfTool
+from .progress import CancelToken, ProgressCallback, checkpoint, worker_pool
+
+MANIFEST_NAME = ".pdf-batch-manifest.json"
+_MANIFEST_VERSION = 1
+
+
+class BatchOperation(Enum):
+    COMPRESS = "compress"  # Every file into a compressed copy
+    SPLIT = "split"  # Every file into files of N pages
+    MERGE = "merge"  # The files of every folder into one file
+
+
+@dataclass
+class BatchTask:
+    """One unit of batch work: an output produced from one or more inputs."""
+
+    name: str  # Key in the manifest and summary: the output path relative to the output directory
+    inputs: list[Path]
+    output: Path  # Output file, or the directory receiving the parts of a split
+
+
+@dataclass
+class TaskResult:
+    name: str
+    status: str  # "done", "skipped" or "failed"
+    inputs: list[str]
+    outputs: list[str] = field(default_factory=list)
+    seconds: float = 0.0
+    input_bytes: int = 0
+    output_bytes: int = 0
+    error: str | None = None
+
+
+@dataclass
+class BatchSummary:
+    operation: str
+    output_dir: str
+    seconds: float = 0.0
+    done: int = 0
+    skipped: int = 0
+    failed: int = 0
+    tasks: list[TaskResult] = field(default_factory=list)
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+def collect_inputs(source: str) -> tuple[Path, list[Path]]:
+    """
+    Find the PDFs of a batch.
+
+    Args:
+        source: A directory, searched recursively, or a glob pattern such
+            as "scans/**/*.pdf"
+
+    Returns:
+        Tuple of (root the inputs are relative to, sorted input paths)
+    """
+    path = Path(source)
+    if path.is_dir():
+        inputs = sorted(p for p in path.rglob("*") if p.suffix.lower() == ".pdf" and p.is_file())
+        return path, inputs
+
+    inputs = sorted(Path(p) for p in glob.glob(source, recursive=True) if p.lower().endswith(".pdf"))
+    if not inputs:
+        return path.parent, []
+    root = Path(os.path.commonpath([p.parent for p in inputs]))
+    return root, [p for p in inputs if p.is_file()]
+
+
+class BatchProcessor:
+    """
+    Run one operation over many PDFs with a pool of worker processes.
+
+    Outputs mirror the layout of the inputs below the output directory. A
+    manifest there records the inputs each output was built from (size,
+    modification time and SHA-256), so a rerun skips outputs that are up to
+    date; an input that was only touched is recognised by its hash.
+    """
+
+    def __init__(
+        self,
+        operation: BatchOperation,
+        output_dir: Path,
+        level: CompressionLevel = CompressionLevel.MEDIUM,
+        pages_per_split: int = 1,
+        workers: int = 1,
+        force: bool = False,
+    ):
+        if workers < 1:
+            raise ValueError("Workers must be at least 1")
+        if pages_per_split < 1:
+            raise ValueError("Pages per split must be at least 1")
+        self._operation = operation
+        self._output_dir = output_dir
+        self._level = level
+        self._pages_per_split = pages_per_split
+        self._workers = workers
+        self._force = force
+
+    def plan(self, root: Path, inputs: list[Path]) -> list[BatchTask]:
+        """Group inputs into tasks, with output paths below the output directory."""
+        # Outputs of an earlier run inside the input tree are not inputs.
+        output_dir = self._output_dir.resolve()
+        inputs = [p for p in inputs if not p.resolve().is_relative_to(output_dir)]
+
+        if self._operation is BatchOperation.MERGE:
+            folders: dict[Path, list[Path]] = {}
+            for path in inputs:
+                folders.setdefault(path.parent, []).append(path)
+            tasks = []
+            for folder, files in folders.items():
+                relative = folder.relative_to(root)
+                name = f"{relative.as_posix()}.pdf" if relative.parts else f"{root.resolve().name}.pdf"
+                tasks.append(BatchTask(name, files, self._output_dir / name))
+            return tasks
+
+        tasks = []
+        for path in inputs:
+            relative = path.relative_to(root)
+            if self._operation is BatchOperation.SPLIT:
+                # The parts of a.pdf land next to each other in the mirrored folder.
+                tasks.append(BatchTask(relative.as_posix(), [path], self._output_dir / relative.parent))
+            else:
+                tasks.append(BatchTask(relative.as_posix(), [path], self._output_dir / relative))
+        return tasks
+
+    def run(
+        self,
+        tasks: list[BatchTask],
+        progress: ProgressCallback | None = None,
+        cancel: CancelToken | None = None,
+    ) -> BatchSummary:
+        """
+        Run the tasks that are not up to date.
+
+        A failing task is recorded in the summary and does not stop the
+        others. The manifest is written even when the run is cancelled, so
+        finished outputs are not redone.
+
+        Raises:
+            OperationCancelled: If cancel was cancelled
+        """
+        start = time.perf_counter()
+        self._output_dir.mkdir(parents=True, exist_ok=True)
+        manifest = self._load_manifest()
+        options = self._options()
+
+        results: dict[str, TaskResult] = {}
+        pending = []
+        for task in tasks:
+            entry = manifest.get(task.name)
+            if not self._force and _is_up_to_date(entry, task, options):
+                results[task.name] = TaskResult(
+                    task.name,
+                    "skipped",
+                    [str(p) for p in task.inputs],
+                    entry["outputs"],
+                    input_bytes=sum(entry["inputs"][str(p)]["size"] for p in task.inputs),
+                    output_bytes=sum(Path(p).stat().st_size for p in entry["outputs"]),
+                )
+            else:
+                pending.append(task)
+
+        done = len(results)
+        try:
+            checkpoint(progress, cancel, "files", done, len(tasks))
+            for result, fingerprints in self._execute(pending, progress, cancel, done, len(tasks)):
+                results[result.name] = result
+                if result.status == "done":
+                    manifest[result.name] = {"options": options, "inputs": fingerprints, "outputs": result.outputs}
+                else:
+                    manifest.pop(result.name, None)
+        finally:
+            self._save_manifest(manifest)
+
+        summary = BatchSummary(self._operation.value, str(self._output_dir))
+        summary.tasks = [results[task.name] for task in tasks]
+        summary.done = sum(result.status == "done" for result in summary.tasks)
+        summary.skipped = sum(result.status == "skipped" for result in summary.tasks)
+        summary.failed = sum(result.status == "failed" for result in summary.tasks)
+        summary.seconds = time.perf_counter() - start
+        return summary
+
+    def _execute(
+        self,
+        tasks: list[BatchTask],
+        progress: ProgressCallback | None,
+        cancel: CancelToken | None,
+        done: int,
+        total: int,
+    ) -> Iterator[tuple[TaskResult, dict]]:
+        """Yield (result, input fingerprints) per task, in completion order."""
+        options = self._options()
+        if self._workers == 1 or len(tasks) < 2:
+            for task in tasks:
+                yield _run_task(self._operation, options, task)
+                done += 1
+                checkpoint(progress, cancel, "files", done, total)
+            return
+
+        with worker_pool(min(self._workers, len(tasks))) as executor:
+            futures = [executor.submit(_run_task, self._operation, options, task) for task in tasks]
+            for future in as_completed(futures):
+                yield future.result()
+                done += 1
+                checkpoint(progress, cancel, "files", done, total)
+
+    def _options(self) -> dict:
+        """Settings that affect the outputs; changing them invalidates the manifest entries."""
+        if self._operation is BatchOperation.COMPRESS:
+            return {"operation": self._operation.value, "level": self._level.name}
+        if self._operation is BatchOperation.SPLIT:
+            return {"operation": self._operation.value, "pages": self._pages_per_split}
+        return {"operation": self._operation.value}
+
+    def _load_manifest(self) -> dict:
+        try:
+            data = json.loads((self._output_dir / MANIFEST_NAME).read_text())
+        except (FileNotFoundError, ValueError):
+            return {}
+        if data.get("version") != _MANIFEST_VERSION:
+            return {}
+        return data.get("tasks", {})
+
+    def _save_manifest(self, manifest: dict) -> None:
+        # Written to a temporary file first, so an interrupted run never
+        # leaves a truncated manifest behind.
+        fd, tmp_name = tempfile.mkstemp(suffix=".tmp", dir=self._output_dir)
+        with os.fdopen(fd, "w") as f:
+            json.dump({"version": _MANIFEST_VERSION, "tasks": manifest}, f, indent=1)
+        os.replace(tmp_name, self._output_dir / MANIFEST_NAME)
+
+
+def _run_task(operation: BatchOperation, options: dict, task: BatchTask) -> tuple[TaskResult, dict]:
+    """Run one task, in a worker process; returns its result and the fingerprints of its inputs."""
+    result = TaskResult(task.name, "done", [str(p) for p in task.inputs])
+    fingerprints = {}
+    start = time.perf_counter()
+    try:
+        # Fingerprints are taken first, so an input changed while the task
+        # runs is redone next time.
+        fingerprints = {str(p): _fingerprint(p) for p in task.inputs}
+        result.input_bytes = sum(f["size"] for f in fingerprints.values())
+
+        tool = PdfTool()
+        if operation is BatchOperation.COMPRESS:
+            task.output.parent.mkdir(parents=True, exist_ok=True)
+            outputs = [tool.compress(task.inputs[0], task.output, CompressionLevel[options["level"]])]
+        elif operation is BatchOperation.SPLIT:
+            outputs = tool.split_every_n_pages(task.inputs[0], task.output, options["pages"])
+        else:
+            task.output.parent.mkdir(parents=True, exist_ok=True)
+            if len(task.inputs) == 1:
+                # A folder holding a single PDF is "merged" into a copy of it.
+                shutil.copyfile(task.inputs[0], task.output)
+                outputs = [task.output]
+            else:
+                outputs = [tool.merge(task.inputs, task.output)]
+
+        result.outputs = [str(p) for p in outputs]
+        result.output_bytes = sum(p.stat().st_size for p in outputs)
+    except Exception as e:
+        result.status = "failed"
+        result.error = str(e)
+    result.seconds = time.perf_counter() - start
+    return result, fingerprints
+
+
+def _fingerprint(path: Path) -> dict:
+    stat = path.stat()
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": _file_digest(path)}
+
+
+def _file_digest(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _is_up_to_date(entry: dict | None, task: BatchTask, options: dict) -> bool:
+    if entry is None or entry.get("options") != options:
+        return False
+    recorded = entry["inputs"]
+    if set(recorded) != {str(p) for p in task.inputs}:
+        return False
+    if not all(Path(p).exists() for p in entry["outputs"]):
+        return False
+
+    for path in task.inputs:
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            return False
+        fingerprint = recorded[str(path)]
+        if stat.st_size != fingerprint["size"]:
+            return False
+        if stat.st_mtime_ns != fingerprint["mtime_ns"]:
+            # Touched but possibly unchanged: compare contents.
+            if _file_digest(path) != fingerprint["sha256"]:
+                return False
+            fingerprint["mtime_ns"] = stat.st_mtime_ns
+    return True
@@ -1,10 +1,19 @@
+import json
+import os
+import signal
+import sys
 from pathlib import Path
 from typing import Optional
 
 import typer
 
+from .batch import BatchOperation, BatchProcessor, collect_inputs
 from .pdf_tool import PdfTool
-from .pdf_compressor import CompressionLevel
+from .pdf_compressor import CompressionLevel, CompressionStats
+from .image_cache import ImageCache
+from .pdf_io import SAVE_PROFILES, SaveProfile
+from .pdf_optimizer import OptimizeOptions
+from .progress import ProgressEvent
 
 app = typer.Typer(help="PDF Tool - Merge and compress PDF files")
 
@@ -19,16 +28,193 @@ def get_compression_level(level: str) -> CompressionLevel:
     return mapping.get(level.lower(), CompressionLevel.MEDIUM)
 
 
+_SAVE_PROFILE_HELP = (
+    f"Output format: {', '.join(SAVE_PROFILES)}. "
+    "compact packs objects into compressed streams, readable by PDF 1.5 and later readers"
+)
+
+
+def get_save_profile(name: str) -> SaveProfile:
+    try:
+        return SaveProfile.named(name)
+    except ValueError as e:
+        typer.echo(f"✗ Error: {e}", err=True)
+        raise typer.Exit(1)
+
+
+class _ProgressBar:
+    """
+    Progress callback drawing a bar on stderr.
+
+    A new bar is started whenever the stage (files, pages, images) changes.
+    When stderr is not a terminal only the labels are printed.
+    """
+
+    def __init__(self, label: str):
+        self._label = label
+        self._stage: str | None = None
+        self._bar = None
+
+    def __enter__(self) -> "_ProgressBar":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._close()
+
+    def __call__(self, event: ProgressEvent) -> None:
+        if self._bar is None or event.stage != self._stage:
+            self._close()
+            self._stage = event.stage
+            self._bar = typer.progressbar(
+                length=event.total,
+                label=f"{self._label} ({event.stage})",
+                item_show_func=_format_saved,
+                file=sys.stderr,
+            )
+            self._bar.__enter__()
+        # Shown next to the bar through item_show_func.
+        self._bar.current_item = event.bytes_saved
+        self._bar.update(event.done - self._bar.pos)
+
+    def _close(self) -> None:
+        if self._bar is not None:
+            self._bar.__exit__(None, None, None)
+            self._bar = None
+
+
+def _format_saved(bytes_saved: int | None) -> str | None:
+    if not bytes_saved:
+        return None
+    return f"{bytes_saved / 1024:.1f}KB saved"
+
+
 @app.command()
 def merge(
     files: list[Path] = typer.Argument(..., help="PDF files to merge (at least 2)"),
     output: Path = typer.Option("merged.pdf", "-o", "--output", help="Output file path"),
+    batch_size: Optional[int] = typer.Option(None, "--batch-size", help="Flush the merged file to disk every N inputs to bound memory use"),
+    jobs: int = typer.Option(1, "-j", "--jobs", help="Number of processes merging groups of inputs in parallel"),
+    dedup: bool = typer.Option(False, "--dedup", help="Keep a single copy of fonts, images and profiles shared by the inputs"),
+    save_profile: str = typer.Option("classic", "--save-profile", help=_SAVE_PROFILE_HELP),
 ):
     """Merge multiple PDF files into one."""
-    tool = PdfTool()
+    tool = PdfTool(get_save_profile(save_profile))
     try:
-        result = tool.merge(files, output)
+        with _ProgressBar("Merging") as progress:
+            result = tool.merge(
+                files, output, progress=progress, batch_size=batch_size, workers=jobs, deduplicate=dedup
+            )
         typer.echo(f"✓ Merged {len(files)} files into: {result}")
+        _echo_merge_stats(tool)
+    except Exception as e:
+        typer.echo(f"✗ Error: {e}", err=True)
+        raise typer.Exit(1)
+
+
+def _echo_merge_stats(tool: PdfTool) -> None:
+    stats = tool.merge_stats
+    line = f"  Pages: {stats.pages}"
+    if stats.batches:
+        line += f" in {stats.batches} batches"
+    if stats.peak_rss_bytes is not None:
+        line += f", peak memory {stats.peak_rss_bytes / (1024 * 1024):.0f}MB"
+    typer.echo(line)
+    if stats.duplicates:
+        typer.echo(f"  Duplicates removed: {stats.duplicates} ({stats.dedup_bytes_saved / 1024:.1f}KB)")
+
+
+def parse_size(size: str) -> int:
+    """Parse "2MB", "500KB", "1.5M" or a plain byte count into bytes."""
+    units = {"": 1, "B": 1, "K": 1024, "KB": 1024, "M": 1024 ** 2, "MB": 1024 ** 2, "G": 1024 ** 3, "GB": 1024 ** 3}
+    text = size.strip().upper()
+    number = text.rstrip("KMGB ")
+    unit = text[len(number):].strip()
+    try:
+        value = float(number) * units[unit]
+    except (ValueError, KeyError):
+        raise ValueError(f"Invalid size: {size}") from None
+    if value < 1:
+        raise ValueError(f"Invalid size: {size}")
+    return int(value)
+
+
+def _echo_image_stats(stats: CompressionStats) -> None:
+    typer.echo(
+        f"  Images: {stats.images_compressed}/{stats.unique_images} recompressed, "
+        f"{stats.redundant_encodes_avoided} redundant encodes avoided"
+    )
+    if stats.skipped:
+        reasons = ", ".join(f"{count} {reason.replace('_', ' ')}" for reason, count in sorted(stats.skipped.items()))
+        typer.echo(f"  Skipped without decoding: {reasons}")
+
+
+def _echo_target(stats: CompressionStats, output_size: int, target_size: int) -> None:
+    if output_size <= target_size:
+        typer.echo(f"  Target: {output_size / 1024:.1f}KB fits {target_size / 1024:.1f}KB")
+    else:
+        typer.echo(
+            f"  Target: {output_size / 1024:.1f}KB does not fit {target_size / 1024:.1f}KB "
+            f"even at the smallest settings",
+            err=True,
+        )
+    jpegs = [setting for setting in stats.settings if setting.quality is not None]
+    lossless = len(stats.settings) - len(jpegs)
+    if jpegs:
+        qualities = _span([setting.quality for setting in jpegs])
+        scales = _span([setting.scale for setting in jpegs])
+        typer.echo(f"  Settings: {len(jpegs)} images at quality {qualities}, scale {scales}")
+    if lossless:
+        typer.echo(f"  Settings: {lossless} images lossless")
+
+
+def _span(values: list[float]) -> str:
+    low, high = min(values), max(values)
+    return f"{low:g}" if low == high else f"{low:g}-{high:g}"
+
+
+def parse_page_ranges(ranges: str) -> list[tuple[int, int]]:
+    """Parse "1-3,4,5-10" into [(1, 3), (4, 4), (5, 10)]."""
+    page_ranges = []
+    for part in ranges.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        start, _, end = part.partition("-")
+        try:
+            page_ranges.append((int(start), int(end or start)))
+        except ValueError:
+            raise ValueError(f"Invalid page range: {part}") from None
+    if not page_ranges:
+        raise ValueError("No page ranges given")
+    return page_ranges
+
+
+@app.command()
+def split(
+    file: Path = typer.Argument(..., help="PDF file to split"),
+    output_dir: Optional[Path] = typer.Option(None, "-o", "--output-dir", help="Directory for the split files (default: next to the input)"),
+    every: Optional[int] = typer.Option(None, "-n", "--every", help="Split into files of N pages each"),
+    ranges: Optional[str] = typer.Option(None, "-r", "--ranges", help='Page ranges, one file each, e.g. "1-3,4,5-10"'),
+    jobs: int = typer.Option(1, "-j", "--jobs", help="Number of processes used to write the split files"),
+    save_profile: str = typer.Option("classic", "--save-profile", help=_SAVE_PROFILE_HELP),
+):
+    """Split a PDF into several files."""
+    if (every is None) == (ranges is None):
+        typer.echo("✗ Error: Give exactly one of --every or --ranges", err=True)
+        raise typer.Exit(1)
+
+    tool = PdfTool(get_save_profile(save_profile))
+    output_dir = output_dir or file.parent
+
+    try:
+        with _ProgressBar("Splitting") as progress:
+            if every is not None:
+                results = tool.split_every_n_pages(file, output_dir, every, progress=progress, workers=jobs)
+            else:
+                results = tool.split_by_ranges(
+                    file, output_dir, parse_page_ranges(ranges), progress=progress, workers=jobs
+                )
+        typer.echo(f"✓ Split {file} into {len(results)} files in: {output_dir}")
     except Exception as e:
         typer.echo(f"✗ Error: {e}", err=True)
         raise typer.Exit(1)
@@ -39,19 +225,52 @@ def compress(
     file: Path = typer.Argument(..., help="PDF file to compress"),
     output: Optional[Path] = typer.Option(None, "-o", "--output", help="Output file path"),
     level: str = typer.Option("medium", "-l", "--level", help="Compression level: low, medium, high, extreme"),
+    jobs: int = typer.Option(1, "-j", "--jobs", help="Number of processes used to recompress images"),
+    cache_dir: Optional[Path] = typer.Option(None, "--cache-dir", help="Directory for caching recompressed images across runs"),
+    cache_max_mb: int = typer.Option(256, "--cache-max-mb", help="Maximum size of the image cache in MB"),
+    target_size: Optional[str] = typer.Option(None, "--target-size", help='Compress only as much as needed to fit this size, e.g. "2MB" or "500KB" (replaces --level)'),
+    optimize: bool = typer.Option(False, "--optimize", help="Also subset fonts, recompress content streams and strip metadata, thumbnails and attachments"),
+    keep: Optional[list[str]] = typer.Option(None, "--keep", help=f"With --optimize, skip one optimization (repeatable): {', '.join(OptimizeOptions.names())}"),
+    save_profile: str = typer.Option("classic", "--save-profile", help=_SAVE_PROFILE_HELP),
 ):
     """Compress a PDF file to reduce its size."""
-    tool = PdfTool()
+    tool = PdfTool(get_save_profile(save_profile))
     compression = get_compression_level(level)
     
     try:
+        target_bytes = parse_size(target_size) if target_size else None
+        optimize_options = OptimizeOptions.all_except(keep or []) if optimize else None
+        cache = ImageCache(cache_dir, cache_max_mb * 1024 * 1024) if cache_dir else None
         input_size = file.stat().st_size
-        result = tool.compress(file, output, compression)
+        with _ProgressBar("Compressing") as progress:
+            result = tool.compress(
+                file,
+                output,
+                compression,
+                workers=jobs,
+                cache=cache,
+                progress=progress,
+                target_size=target_bytes,
+                optimize=optimize_options,
+            )
         output_size = result.stat().st_size
         reduction = (1 - output_size / input_size) * 100
         
+        stats = tool.compression_stats
+        
         typer.echo(f"✓ Compressed: {result}")
         typer.echo(f"  Size: {input_size / 1024:.1f}KB → {output_size / 1024:.1f}KB ({reduction:.1f}% reduction)")
+        _echo_image_stats(stats)
+        if cache:
+            typer.echo(f"  Cache: {stats.cache_hits} hits, {stats.cache_misses} misses")
+        if target_bytes is not None:
+            _echo_target(stats, output_size, target_bytes)
+        if stats.optimized:
+            savings = ", ".join(
+                f"{name.replace('_', ' ')} {'skipped' if saved is None else f'{saved / 1024:.1f}KB'}"
+                for name, saved in stats.optimized.items()
+            )
+            typer.echo(f"  Optimized: {savings}")
     except Exception as e:
         typer.echo(f"✗ Error: {e}", err=True)
         raise typer.Exit(1)
@@ -62,18 +281,109 @@ def merge_compress(
     files: list[Path] = typer.Argument(..., help="PDF files to merge and compress"),
     output: Path = typer.Option("merged.pdf", "-o", "--output", help="Output file path"),
     level: str = typer.Option("medium", "-l", "--level", help="Compression level: low, medium, high, extreme"),
+    jobs: int = typer.Option(1, "-j", "--jobs", help="Number of processes used to merge groups of inputs and recompress images"),
+    batch_size: Optional[int] = typer.Option(None, "--batch-size", help="Flush the merged file to disk every N inputs to bound memory use"),
+    save_profile: str = typer.Option("classic", "--save-profile", help=_SAVE_PROFILE_HELP),
 ):
     """Merge multiple PDF files and compress the result."""
-    tool = PdfTool()
+    tool = PdfTool(get_save_profile(save_profile))
     compression = get_compression_level(level)
     
     try:
-        result = tool.merge_and_compress(files, output, compression)
+        with _ProgressBar("Merging and compressing") as progress:
+            result = tool.merge_and_compress(
+                files, output, compression, workers=jobs, progress=progress, batch_size=batch_size
+            )
+        stats = tool.compression_stats
         typer.echo(f"✓ Merged and compressed {len(files)} files into: {result}")
+        _echo_image_stats(stats)
+        _echo_merge_stats(tool)
+    except Exception as e:
+        typer.echo(f"✗ Error: {e}", err=True)
+        raise typer.Exit(1)
+
+
+@app.command()
+def batch(
+    source: str = typer.Argument(..., help='Directory (searched recursively) or quoted glob, e.g. "scans/**/*.pdf"'),
+    operation: BatchOperation = typer.Option(..., "--op", help="compress every file, split every file, or merge the files of every folder"),
+    output_dir: Path = typer.Option(..., "-o", "--output-dir", help="Directory for the outputs, mirroring the input folders"),
+    level: str = typer.Option("medium", "-l", "--level", help="Compression level: low, medium, high, extreme"),
+    every: int = typer.Option(1, "-n", "--every", help="Pages per file when splitting"),
+    jobs: int = typer.Option(1, "-j", "--jobs", help="Number of processes working on files in parallel"),
+    force: bool = typer.Option(False, "--force", help="Redo outputs that are already up to date"),
+    summary_path: Optional[Path] = typer.Option(None, "--summary", help="JSON summary path (default: batch-summary.json in the output directory)"),
+):
+    """Run one operation over many PDFs, skipping outputs that are up to date."""
+    try:
+        root, inputs = collect_inputs(source)
+        if not inputs:
+            raise ValueError(f"No PDF files found: {source}")
+
+        processor = BatchProcessor(
+            operation, output_dir, get_compression_level(level), pages_per_split=every, workers=jobs, force=force
+        )
+        tasks = processor.plan(root, inputs)
+        with _ProgressBar(operation.value.capitalize()) as progress:
+            summary = processor.run(tasks, progress=progress)
+
+        summary_path = summary_path or output_dir / "batch-summary.json"
+        summary_path.write_text(json.dumps(summary.to_dict(), indent=2))
     except Exception as e:
         typer.echo(f"✗ Error: {e}", err=True)
         raise typer.Exit(1)
 
+    typer.echo(
+        f"✓ {summary.done} done, {summary.skipped} up to date, {summary.failed} failed "
+        f"in {summary.seconds:.1f}s; summary: {summary_path}"
+    )
+    for result in summary.tasks:
+        if result.status == "failed":
+            typer.echo(f"  ✗ {result.name}: {result.error}", err=True)
+    if summary.failed:
+        raise typer.Exit(1)
+
+
+@app.command()
+def serve(
+    socket_path: Optional[Path] = typer.Option(
+        None, "--socket", help="Unix domain socket to listen on (default: pdf-tool.sock in $XDG_RUNTIME_DIR or a per-user temp dir)"
+    ),
+    jobs: int = typer.Option(os.cpu_count() or 1, "-j", "--jobs", help="Number of worker processes kept running"),
+):
+    """Keep workers running and serve requests from the client command until interrupted."""
+    # Imported here, like the client, since the server only runs on
+    # platforms with Unix domain sockets.
+    from .server import PdfServer
+
+    try:
+        server = PdfServer(socket_path, jobs)
+    except Exception as e:
+        typer.echo(f"✗ Error: {e}", err=True)
+        raise typer.Exit(1)
+
+    # Stopping the service with SIGTERM closes the workers and removes the
+    # socket, like Ctrl+C does.
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    typer.echo(f"✓ Serving on {server.socket_path} with {jobs} workers", err=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+@app.command(
+    context_settings={"allow_extra_args": True, "ignore_unknown_options": True, "help_option_names": []},
+    add_help_option=False,
+)
+def client(ctx: typer.Context):
+    """Send one request to a running server; see "client --help"."""
+    # main.py runs the client without importing this module; this command
+    # only makes it show up in the command list.
+    from .client import main as client_main
+
+    client_main(ctx.args)
+
 
 def main():
     app()
@@ -0,0 +1,185 @@
+# Only the standard library is imported here, so a client process starts
+# without loading PyMuPDF or Pillow.
+import argparse
+import json
+import os
+import socket
+import sys
+import tempfile
+from pathlib import Path
+
+# Request parameters holding paths, which are made absolute before sending
+_PATH_PARAMS = {"input", "inputs", "output", "output_dir"}
+# Names of the compression levels, kept here so the client does not import
+# the compressor
+_LEVELS = ("low", "medium", "high", "extreme")
+
+
+def default_socket() -> Path:
+    """
+    Default socket path, in a directory private to the current user:
+    $XDG_RUNTIME_DIR where set, otherwise a directory of their own in the
+    shared temporary directory, which the server creates.
+
+    Resolved when needed rather than at import, since the CLI imports this
+    module on every platform.
+    """
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime_dir:
+        return Path(runtime_dir) / "pdf-tool.sock"
+    user_dir = f"pdf-tool-{os.getuid()}" if hasattr(os, "getuid") else "pdf-tool"
+    return Path(tempfile.gettempdir()) / user_dir / "pdf-tool.sock"
+
+
+class ServerError(Exception):
+    """Raised when the server reports a failed request."""
+
+
+class PdfClient:
+    """
+    Connection to a running PDF Tool server.
+
+    Requests are JSON objects naming an operation and the files to work on;
+    paths are sent as absolute paths, since the server has its own working
+    directory. One connection can carry any number of requests.
+
+    Example:
+        with PdfClient() as client:
+            client.request("compress", input="scan.pdf", output="small.pdf", level="high")
+    """
+
+    def __init__(self, socket_path: Path | None = None):
+        """
+        Args:
+            socket_path: Socket of the server, default_socket() if None
+        """
+        if socket_path is None:
+            socket_path = default_socket()
+        # A socket created by another user would hand them the requests,
+        # and with them the paths and contents of the files.
+        if hasattr(os, "getuid") and socket_path.stat().st_uid != os.getuid():
+            raise PermissionError(f"Socket {socket_path} belongs to another user")
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            self._sock.connect(str(socket_path))
+        except OSError:
+            self._sock.close()
+            raise
+        self._reader = self._sock.makefile("rb")
+
+    def __enter__(self) -> "PdfClient":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._reader.close()
+        self._sock.close()
+
+    def request(self, op: str, **params) -> dict:
+        """
+        Run one operation on the server and wait for it.
+
+        Args:
+            op: "compress", "merge", "split", "extract" or "ping"
+            params: Arguments of the operation; see server.handle_request
+
+        Returns:
+            The result of the operation
+
+        Raises:
+            ServerError: If the operation failed
+        """
+        for key in _PATH_PARAMS.intersection(params):
+            params[key] = _absolute(params[key])
+        request = {"op": op, **params}
+        self._sock.sendall(json.dumps(request).encode() + b"\n")
+        line = self._reader.readline()
+        if not line:
+            raise ServerError("Server closed the connection")
+
+        response = json.loads(line)
+        if not response["ok"]:
+            raise ServerError(response["error"])
+        return response["result"]
+
+
+def _absolute(value: str | Path | list | None) -> str | list | None:
+    if value is None:
+        return None
+    if isinstance(value, list):
+        return [_absolute(item) for item in value]
+    return str(Path(value).absolute())
+
+
+def main(argv: list[str] | None = None) -> None:
+    """
+    Command line client, e.g. "python main.py client compress scan.pdf -o small.pdf".
+
+    Prints the result as JSON. Kept free of typer, so a request costs little
+    more than interpreter start-up.
+    """
+    parser = argparse.ArgumentParser(prog="main.py client", description="Send one request to a running server.")
+    parser.add_argument("op", choices=["compress", "merge", "split", "extract", "ping"])
+    parser.add_argument("files", nargs="*", type=Path, help="Input PDF files")
+    parser.add_argument("-o", "--output", type=Path, help="Output file, or output directory when splitting")
+    parser.add_argument("-l", "--level", default="medium", type=str.lower, choices=_LEVELS, help="Compression level")
+    parser.add_argument("-n", "--every", type=int, help="Split into files of N pages each")
+    parser.add_argument("-r", "--ranges", help="Page ranges: one file each when splitting, the pages to extract otherwise")
+    parser.add_argument("--dedup", action="store_true", help="Deduplicate shared resources when merging")
+    parser.add_argument(
+        "--socket", type=Path, help="Socket of the server (default: pdf-tool.sock in $XDG_RUNTIME_DIR or a per-user temp dir)"
+    )
+    args = parser.parse_intermixed_args(argv)
+
+    if args.op != "ping" and not args.files:
+        parser.error("No input file given")
+
+    params: dict = {}
+    if args.op == "compress":
+        params = {"input": args.files[0], "output": args.output, "level": args.level}
+    elif args.op == "merge":
+        params = {"inputs": args.files, "output": args.output or Path("merged.pdf"), "deduplicate": args.dedup}
+    elif args.op == "split":
+        params = {"input": args.files[0], "output_dir": args.output or args.files[0].parent}
+        if args.every is not None:
+            params["every"] = args.every
+        else:
+            params["ranges"] = _parse_ranges(parser, args.ranges)
+    elif args.op == "extract":
+        input_file = args.files[0]
+        pages = [page for start, end in _parse_ranges(parser, args.ranges) for page in _page_span(start, end)]
+        params = {
+            "input": input_file,
+            "output": args.output or input_file.with_stem(f"{input_file.stem}_extracted"),
+            "pages": pages,
+        }
+
+    try:
+        with PdfClient(args.socket) as client:
+            result = client.request(args.op, **params)
+    except (OSError, ServerError) as e:
+        print(f"✗ Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    print(json.dumps(result))
+
+
+def _parse_ranges(parser: argparse.ArgumentParser, ranges: str | None) -> list[tuple[int, int]]:
+    """Parse "1-3,4" into [(1, 3), (4, 4)], like the CLI's --ranges."""
+    if not ranges:
+        parser.error("--ranges is required")
+    page_ranges = []
+    for part in ranges.split(","):
+        start, _, end = part.strip().partition("-")
+        try:
+            page_ranges.append((int(start), int(end or start)))
+        except ValueError:
+            parser.error(f"Invalid page range: {part}")
+    return page_ranges
+
+
+def _page_span(start: int, end: int) -> range:
+    """Pages start to end inclusive; a range like "7-5" runs backwards, as in the web interface."""
+    step = 1 if start <= end else -1
+    return range(start, end + step, step)
@@ -0,0 +1,166 @@
+import os
+import struct
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+
+# Bump whenever the encoder output changes so stale entries are not reused.
+_FORMAT_VERSION = 4
+# Width, height, bits per component, then the lengths of the filter,
+# colorspace and soft mask, which precede the image data.
+_HEADER = struct.Struct("<IIBBII")
+_SUFFIX = ".img"
+
+
+@dataclass(frozen=True)
+class EncodedImage:
+    """A recompressed image stream with the dictionary entries it must be written with."""
+
+    data: bytes
+    width: int
+    height: int
+    filter: str = "/DCTDecode"
+    colorspace: str = "/DeviceRGB"  # PDF syntax, e.g. "[/Indexed /DeviceRGB 3 <...>]"
+    bits_per_component: int = 8
+    # Flate compressed 8-bit soft mask at width x height replacing the
+    # image's SMask, or empty to keep it
+    smask: bytes = b""
+
+
+class ImageCache:
+    """
+    Size-bounded on-disk LRU cache of recompressed images.
+
+    Entries are keyed by the SHA-256 digest of the extracted image bytes and
+    the compression level, and hold the encoded image together with the
+    dictionary entries it must be written with. Images that do not shrink are
+    cached as well (with empty data), so they are not decoded again either.
+
+    Recency is tracked through file modification times, which lets several
+    processes share one cache directory.
+    """
+
+    def __init__(self, directory: Path, max_bytes: int = 256 * 1024 * 1024):
+        if max_bytes < 1:
+            raise ValueError("Cache size must be at least 1 byte")
+        self._directory = directory
+        self._max_bytes = max_bytes
+        self._directory.mkdir(parents=True, exist_ok=True)
+        self._size = sum(path.stat().st_size for path in self._entries())
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def directory(self) -> Path:
+        return self._directory
+
+    @staticmethod
+    def make_key(digest: str, level_name: str) -> str:
+        """Build a cache key from the hex SHA-256 digest of an image and a level name."""
+        return f"{digest}-{level_name.lower()}-v{_FORMAT_VERSION}"
+
+    def get(self, key: str) -> EncodedImage | None:
+        """
+        Look up an encoded image.
+
+        Returns:
+            The encoded image, or None on a miss. Empty data means the image
+            was not worth recompressing.
+        """
+        path = self._path(key)
+        try:
+            blob = path.read_bytes()
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+
+        if len(blob) < _HEADER.size:
+            self.misses += 1
+            return None
+
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+        self.hits += 1
+        width, height, bits, filter_length, colorspace_length, smask_length = _HEADER.unpack_from(blob)
+        offset = _HEADER.size
+        filter_name = blob[offset:offset + filter_length].decode()
+        offset += filter_length
+        colorspace = blob[offset:offset + colorspace_length].decode()
+        offset += colorspace_length
+        smask = blob[offset:offset + smask_length]
+        offset += smask_length
+        return EncodedImage(blob[offset:], width, height, filter_name, colorspace, bits, smask)
+
+    def put(self, key: str, image: EncodedImage) -> None:
+        """Store an encoded image, evicting least recently used entries if needed."""
+        filter_name = image.filter.encode()
+        colorspace = image.colorspace.encode()
+        blob = b"".join((
+            _HEADER.pack(
+                image.width,
+                image.height,
+                image.bits_per_component,
+                len(filter_name),
+                len(colorspace),
+                len(image.smask),
+            ),
+            filter_name,
+            colorspace,
+            image.smask,
+            image.data,
+        ))
+        if len(blob) > self._max_bytes:
+            return
+
+        path = self._path(key)
+        path.parent.mkdir(exist_ok=True)
+
+        # An entry being overwritten no longer counts towards the size.
+        try:
+            replaced = path.stat().st_size
+        except FileNotFoundError:
+            replaced = 0
+
+        # Write to a temporary file first so concurrent readers never see a
+        # partially written entry.
+        fd, tmp_name = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as tmp:
+                tmp.write(blob)
+            os.replace(tmp_name, path)
+        except BaseException:
+            Path(tmp_name).unlink(missing_ok=True)
+            raise
+
+        self._size += len(blob) - replaced
+        if self._size > self._max_bytes:
+            self._evict()
+
+    def _path(self, key: str) -> Path:
+        return self._directory / key[:2] / f"{key}{_SUFFIX}"
+
+    def _entries(self) -> list[Path]:
+        return list(self._directory.glob(f"*/*{_SUFFIX}"))
+
+    def _evict(self) -> None:
+        entries = []
+        for path in self._entries():
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        entries.sort()
+        self._size = sum(size for _, size, _ in entries)
+
+        # Evict down to 90% so the next few puts do not rescan the directory.
+        target = self._max_bytes * 0.9
+        for _, size, path in entries:
+            if self._size <= target:
+                break
+            path.unlink(missing_ok=True)
+            self._size -= size
@@ -1,9 +1,19 @@
+import hashlib
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field, replace
 from pathlib import Path
 from io import BytesIO
 from enum import Enum
+from typing import TYPE_CHECKING
 
-import fitz
-from PIL import Image
+from .image_cache import EncodedImage, ImageCache
+from .pdf_io import PdfResult, PdfSource, PdfTarget, SaveProfile, open_pdf, save_pdf, saved_object_size
+from .pdf_optimizer import OptimizeOptions, optimize_document
+from .progress import CancelToken, ProgressCallback, checkpoint, shutdown_pool
+
+if TYPE_CHECKING:
+    import fitz
 
 
 class CompressionLevel(Enum):
@@ -20,74 +30,991 @@ class CompressionLevel(Enum):
     def scale(self) -> float:
         return self.value[1]
 
+    @property
+    def resample(self) -> str:
+        """Name of the Pillow filter images are downscaled with."""
+        return _RESAMPLE_FILTERS[self.name]
+
+    @property
+    def quantize(self) -> bool:
+        """Whether images may also be reduced to a 256 color palette."""
+        return self in (CompressionLevel.HIGH, CompressionLevel.EXTREME)
+
+
+# Cheaper filters at the levels that discard more detail anyway, where their
+# softer or slightly aliased result is not visible after JPEG encoding. Names
+# rather than Pillow constants, so Pillow is only imported to decode images.
+_RESAMPLE_FILTERS = {"LOW": "LANCZOS", "MEDIUM": "BICUBIC", "HIGH": "BILINEAR", "EXTREME": "BILINEAR"}
+
+
+@dataclass
+class CompressionStats:
+    """Counters collected during a compression run."""
+
+    unique_images: int = 0
+    image_references: int = 0
+    images_compressed: int = 0
+    duplicate_images: int = 0
+    cache_hits: int = 0
+    cache_misses: int = 0
+    bytes_saved: int = 0  # Sum over image streams of original minus new length
+    # Images left alone without decoding them, by reason (see _skip_reason)
+    skipped: dict[str, int] = field(default_factory=dict)
+    # Encodings chosen per image when compressing to a target size
+    settings: list["ImageSetting"] = field(default_factory=list)
+    # Bytes saved by each optimization besides images, by OptimizeOptions
+    # name; None for one that failed and was skipped
+    optimized: dict[str, int | None] = field(default_factory=dict)
+
+    @property
+    def redundant_encodes_avoided(self) -> int:
+        """Encodes saved by recompressing shared or identical images only once."""
+        return self.image_references - self.unique_images + self.duplicate_images
+
+
+@dataclass(frozen=True)
+class ImageSetting:
+    """Encoding chosen for one image when compressing to a target size."""
+
+    xref: int
+    quality: int | None  # None for a lossless bilevel or palette encoding
+    scale: float
+    original_bytes: int  # Image and soft mask streams
+    encoded_bytes: int
+
+
+# Images stored in fewer bytes gain too little from re-encoding to be worth
+# decoding.
+_MIN_IMAGE_BYTES = 2048
+# JPEG needs more bytes per output pixel than this even for flat content such
+# as charts and screenshots.
+_MIN_BYTES_PER_PIXEL = 0.02
+# Re-encoding is only tried when it is predicted to save more than this
+# fraction of the stored size.
+_MIN_SAVING = 0.05
+# Size of a JPEG written by Pillow relative to quality 85, by quality;
+# averaged over photos and screenshots.
+_JPEG_RELATIVE_SIZE = {
+    10: 0.21, 15: 0.27, 20: 0.32, 25: 0.37, 30: 0.42, 35: 0.45, 40: 0.48, 45: 0.52, 50: 0.55,
+    55: 0.57, 60: 0.61, 65: 0.65, 70: 0.70, 75: 0.80, 80: 0.88, 85: 1.00, 90: 1.18, 95: 1.75,
+}
+# IJG standard luminance quantization table, which the tables of most JPEG
+# encoders are scaled from
+_STD_LUMINANCE_TABLE_SUM = sum((
+    16, 11, 10, 16, 24, 40, 51, 61, 12, 12, 14, 19, 26, 58, 60, 55,
+    14, 13, 16, 24, 40, 57, 69, 56, 14, 17, 22, 29, 51, 87, 80, 62,
+    18, 22, 37, 56, 68, 109, 103, 77, 24, 35, 55, 64, 81, 104, 113, 92,
+    49, 64, 78, 87, 103, 121, 120, 101, 72, 92, 95, 98, 112, 100, 103, 99,
+))
+
+# Search space of compression to a target size. Scales are tried in order,
+# each with a binary search over the qualities, so an image is only
+# downscaled when no quality fits at the larger scale.
+_TARGET_QUALITIES = tuple(range(20, 101, 5))
+_TARGET_SCALES = (1.0, 0.85, 0.7, 0.5, 0.35)
+# An image whose best fitting encoding saves more than this multiple of its
+# share of the excess is kept as it is while the images after it can still
+# cover the excess; the coarse quality steps would otherwise compress it
+# far more than needed.
+_MAX_OVERSHOOT = 2.0
+# Fraction of their stored size the images not yet visited are assumed to
+# be able to shed, when judging whether they can cover the excess, at most;
+# lowered to the smallest fraction an image visited so far could shed.
+_COVERABLE_SAVING = 0.5
+
+# Pillow modes of extracted images that can be re-encoded, and the PDF
+# colorspace of each mode JPEGs are written in
+_DECODABLE_MODES = {"1", "L", "LA", "P", "PA", "RGB", "RGBA", "CMYK", "YCbCr"}
+_JPEG_COLORSPACES = {"L": "/DeviceGray", "RGB": "/DeviceRGB"}
+# Images with more colors than this are photo-like, and reduced to a palette
+# they compress worse than as JPEG.
+_MAX_QUANTIZED_COLORS = 4096
+
 
 class PdfCompressor:
-    def __init__(self, compression_level: CompressionLevel = CompressionLevel.MEDIUM):
+    def __init__(
+        self,
+        compression_level: CompressionLevel = CompressionLevel.MEDIUM,
+        workers: int = 1,
+        cache: ImageCache | None = None,
+        optimize: OptimizeOptions | None = None,
+        save_profile: SaveProfile | None = None,
+    ):
+        """
+        Args:
+            compression_level: Quality/scale preset applied to every image
+            workers: Number of processes used to re-encode images. With more
+                than one worker, decoding, resizing and JPEG encoding run in a
+                process pool and only the stream updates are applied to the
+                document in this process; the output is identical to the
+                serial path. The pool is started when first needed and kept
+                until close(), so feeding a document in batches starts it
+                once.
+            cache: Optional cache of previously encoded images, consulted
+                before decoding an image
+            optimize: Optional optimizations of fonts, content streams and
+                other non-image data applied by compress() after the
+                images; see optimize_document()
+            save_profile: Format of the files written by compress()
+        """
+        if workers < 1:
+            raise ValueError("Workers must be at least 1")
         self._level = compression_level
+        self._workers = workers
+        self._cache = cache
+        self._optimize = optimize
+        self._save_profile = save_profile
+        self._executor: ProcessPoolExecutor | None = None
+        self.reset()
 
-    def compress(self, input_file: Path, output_file: Path | None = None) -> Path:
-        if not input_file.exists():
-            raise FileNotFoundError(f"File not found: {input_file}")
+    @property
+    def stats(self) -> CompressionStats:
+        """Statistics of the current compression run."""
+        return self._stats
 
-        if output_file is None:
-            output_file = input_file.with_stem(f"{input_file.stem}_compressed")
+    def compress(
+        self,
+        input_file: PdfSource,
+        output_file: PdfTarget = None,
+        progress: ProgressCallback | None = None,
+        cancel: CancelToken | None = None,
+        target_size: int | None = None,
+    ) -> PdfResult:
+        """
+        Compress the images of a PDF.
 
-        doc = fitz.open(input_file)
+        Args:
+            input_file: Path or in-memory buffer of the PDF
+            output_file: Path or stream to write to. If None, a path input is
+                written next to the original with a "_compressed" suffix and
+                a buffer input is returned as bytes.
+            progress: Optional callback receiving an "images" event after
+                each image, with the bytes saved so far
+            cancel: Optional token checked after each image
+            target_size: If given, the compression level is ignored and
+                images are compressed only as much as needed for the file to
+                fit in target_size bytes; see compress_to_size()
 
-        for page_num in range(len(doc)):
-            page = doc[page_num]
-            self._compress_page_images(doc, page)
+        Returns:
+            The written path or stream, or the compressed PDF bytes
 
-        output_file.parent.mkdir(parents=True, exist_ok=True)
-        doc.save(
-            output_file,
-            garbage=4,
-            deflate=True,
-            clean=True,
-        )
-        doc.close()
+        Raises:
+            OperationCancelled: If cancel was cancelled
+        """
+        if isinstance(input_file, Path):
+            if not input_file.exists():
+                raise FileNotFoundError(f"File not found: {input_file}")
+
+            if output_file is None:
+                output_file = input_file.with_stem(f"{input_file.stem}_compressed")
+
+        doc = open_pdf(input_file)
+        self.reset()
+        try:
+            if target_size is not None:
+                self.compress_to_size(doc, target_size, progress, cancel)
+            else:
+                self.compress_document(doc, progress=progress, cancel=cancel)
+            if self._optimize is not None:
+                self._stats.optimized = optimize_document(doc, self._optimize)
+            output = save_pdf(
+                doc,
+                output_file,
+                self._save_profile,
+                garbage=4,
+                deflate=True,
+                # optimize_document() cleans content streams itself, and
+                # cleaning again would undo their recompression.
+                clean=self._optimize is None,
+            )
+        finally:
+            doc.close()
+            self.close()
+
+        return output
+
+    def close(self) -> None:
+        """Stop the worker processes, if any; a later run starts new ones."""
+        if self._executor is not None:
+            shutdown_pool(self._executor)
+            self._executor = None
+
+    def reset(self) -> None:
+        """Start a new compression run, clearing stats and remembered images."""
+        self._stats = CompressionStats()
+        self._seen_xrefs: set[int] = set()
+        self._encoded: dict[str, EncodedImage | None] = {}
+
+    def compress_document(
+        self,
+        doc: "fitz.Document",
+        pages: range | None = None,
+        progress: ProgressCallback | None = None,
+        cancel: CancelToken | None = None,
+    ) -> None:
+        """
+        Recompress the images on the given pages of an open document in place.
+
+        Images already handled earlier in the current run are not processed
+        again, and an image whose content matches one encoded earlier in the
+        run reuses that encoding. This lets callers feed a document in
+        batches, e.g. after each inserted source file when merging.
+
+        Args:
+            doc: Document to modify
+            pages: 0-indexed pages to process, all pages if None
+            progress: Optional callback receiving an "images" event after
+                each image of this batch
+            cancel: Optional token checked after each image
+        """
+        image_index = self._build_image_index(doc, pages)
+        xrefs = [xref for xref in image_index if xref not in self._seen_xrefs]
+        self._seen_xrefs.update(xrefs)
+
+        self._stats.unique_images += len(xrefs)
+        self._stats.image_references += sum(len(page_nums) for page_nums in image_index.values())
+
+        checkpoint(progress, cancel, "images", 0, len(xrefs), self._stats.bytes_saved)
+        if self._workers > 1:
+            self._compress_images_parallel(doc, xrefs, progress, cancel)
+        else:
+            for done, xref in enumerate(xrefs, start=1):
+                try:
+                    self._compress_image(doc, xref)
+                except Exception:
+                    pass
+                checkpoint(progress, cancel, "images", done, len(xrefs), self._stats.bytes_saved)
+
+    def compress_to_size(
+        self,
+        doc: "fitz.Document",
+        target_size: int,
+        progress: ProgressCallback | None = None,
+        cancel: CancelToken | None = None,
+    ) -> None:
+        """
+        Recompress images of an open document until it fits a size budget.
+
+        The saved size is estimated as the size of all other objects plus
+        the image and soft mask streams. Images are visited largest first,
+        each decoded once, and given a share of the remaining excess
+        proportional to its size; the smallest of the lossless encodings and
+        the best JPEG that fits the image's budget is chosen (see
+        _search_encoding()). Visiting stops as
+        soon as the estimate fits, so images are only compressed as much as
+        needed. An image whose encoding would save far more than its share
+        is kept as long as the images after it can make up the excess, and
+        only re-encoded at the end if they could not. The chosen encodings
+        are listed in stats.settings.
+
+        Runs in this process regardless of workers, since each image's
+        budget depends on what the previous ones saved. The budget may be
+        missed if even the smallest encodings do not fit.
+
+        Args:
+            doc: Document to modify
+            target_size: Size budget of the saved document in bytes
+            progress: Optional callback receiving an "images" event after
+                each image
+            cancel: Optional token checked after each image
+        """
+        if target_size < 1:
+            raise ValueError("Target size must be at least 1 byte")
+
+        # Identical images under different xrefs are encoded once; the copies
+        # are merged when saving, so they count once towards the size. Each
+        # image's length includes its soft mask, which may be rewritten.
+        images: dict[str, tuple[list[int], bytes, bytes | None, int, int]] = {}
+        smask_xrefs: set[int] = set()
+        image_index = self._build_image_index(doc)
+        xrefs = list(image_index)
+        for xref in xrefs:
+            try:
+                reason = _skip_reason(doc, xref, None, 1.0)
+                extracted = _extract_image(doc, xref) if reason is None else None
+            except Exception:
+                reason, extracted = None, None
+            if reason is not None:
+                self._skip(reason)
+            if not extracted:
+                continue
+            digest = _image_digest(*extracted)
+            if digest in images:
+                images[digest][0].append(xref)
+                self._stats.duplicate_images += 1
+            else:
+                smask_xref = _smask_xref(doc, xref)
+                smask_length = _stream_length(doc, smask_xref) if smask_xref else 0
+                if smask_xref:
+                    smask_xrefs.add(smask_xref)
+                images[digest] = ([xref], *extracted, _stream_length(doc, xref) + smask_length, smask_length)
+        self._stats.unique_images += len(xrefs)
+        self._stats.image_references += sum(len(page_nums) for page_nums in image_index.values())
+
+        image_xrefs = {xref for targets, *_ in images.values() for xref in targets} | smask_xrefs
+        image_bytes_total = sum(image[3] for image in images.values())
+        excess = _size_without(doc, image_xrefs) + image_bytes_total - target_size
+        remaining = image_bytes_total
+
+        ordered = sorted(images.values(), key=lambda image: -image[3])
+        deferred: list[tuple[list[int], int, tuple[EncodedImage, int | None, float, int]]] = []
+        coverable = _COVERABLE_SAVING
+        checkpoint(progress, cancel, "images", 0, len(ordered), self._stats.bytes_saved)
+        for done, (targets, image_bytes, smask_bytes, length, smask_length) in enumerate(ordered, start=1):
+            if excess <= 0:
+                break
+            share = excess * length // remaining
+            remaining -= length
+            try:
+                found = _search_encoding(image_bytes, length - share, length, smask_bytes, smask_length)
+            except Exception:
+                found = None
+
+            if found is not None:
+                saving = length - found[3]
+                coverable = min(coverable, saving / length)
+                if saving > share * _MAX_OVERSHOOT and excess <= remaining * coverable:
+                    deferred.append((targets, length, found))
+                else:
+                    self._apply_setting(doc, targets, length, found)
+                    excess -= saving
+            checkpoint(progress, cancel, "images", done, len(ordered), self._stats.bytes_saved)
+
+        # The images after the kept ones could not make up the excess after
+        # all. Each time, the kept image saving the least that still covers
+        # the excess is re-encoded, or if none does, the one saving the least.
+        while excess > 0 and deferred:
+            savings = [length - found[3] for _, length, found in deferred]
+            covering = [idx for idx, saving in enumerate(savings) if saving >= excess] or range(len(deferred))
+            pick = min(covering, key=savings.__getitem__)
+            targets, length, found = deferred.pop(pick)
+            self._apply_setting(doc, targets, length, found)
+            excess -= savings[pick]
+
+    def _apply_setting(
+        self,
+        doc: "fitz.Document",
+        xrefs: list[int],
+        original_length: int,
+        found: tuple[EncodedImage, int | None, float, int],
+    ) -> None:
+        encoded, quality, scale, size = found
+        for xref in xrefs:
+            self._apply_image_safe(doc, xref, encoded)
+        self._stats.settings.append(ImageSetting(xrefs[0], quality, scale, original_length, size))
 
-        return output_file
+    def _build_image_index(self, doc: "fitz.Document", pages: range | None = None) -> dict[int, list[int]]:
+        """Map every image xref on the given pages to the pages referencing it."""
+        index: dict[int, list[int]] = {}
+        for page_num in pages if pages is not None else range(len(doc)):
+            for img_info in doc.get_page_images(page_num, full=True):
+                page_nums = index.setdefault(img_info[0], [])
+                if not page_nums or page_nums[-1] != page_num:
+                    page_nums.append(page_num)
+        return index
 
-    def _compress_page_images(self, doc: fitz.Document, page: fitz.Page) -> None:
-        image_list = page.get_images(full=True)
+    def _compress_image(self, doc: "fitz.Document", xref: int) -> None:
+        reason = _skip_reason(doc, xref, self._level.quality, self._level.scale)
+        if reason is not None:
+            self._skip(reason)
+            return
+
+        extracted = _extract_image(doc, xref)
+        if not extracted:
+            return
+
+        image_bytes, smask_bytes = extracted
+        digest = _image_digest(image_bytes, smask_bytes)
+        found, encoded = self._lookup(digest)
+        if not found:
+            succeeded, encoded = _encode_image_safe(
+                image_bytes,
+                self._level.quality,
+                self._level.scale,
+                self._level.resample,
+                smask_bytes,
+                self._level.quantize,
+            )
+            self._remember(digest, encoded, succeeded)
+
+        if encoded is not None:
+            self._apply_image(doc, xref, encoded)
 
-        for img_info in image_list:
-            xref = img_info[0]
+    def _compress_images_parallel(
+        self,
+        doc: "fitz.Document",
+        xrefs: list[int],
+        progress: ProgressCallback | None = None,
+        cancel: CancelToken | None = None,
+    ) -> None:
+        # Images are grouped by content so identical images stored under
+        # different xrefs are only sent to the pool once.
+        pending: dict[str, list[int]] = {}
+        payloads: list[tuple[bytes, bytes | None]] = []
+        done = 0
+        for xref in xrefs:
+            if cancel is not None:
+                cancel.raise_if_cancelled()
             try:
-                self._compress_image(doc, page, xref)
+                reason = _skip_reason(doc, xref, self._level.quality, self._level.scale)
+                extracted = _extract_image(doc, xref) if reason is None else None
             except Exception:
-                pass
+                reason, extracted = None, None
+            if reason is not None:
+                self._skip(reason)
+            if not extracted:
+                done += 1
+                continue
 
-    def _compress_image(self, doc: fitz.Document, page: fitz.Page, xref: int) -> None:
-        img_data = doc.extract_image(xref)
-        if not img_data:
+            digest = _image_digest(*extracted)
+            if digest in pending:
+                pending[digest].append(xref)
+                self._stats.duplicate_images += 1
+                continue
+
+            found, encoded = self._lookup(digest)
+            if found:
+                if encoded is not None:
+                    self._apply_image_safe(doc, xref, encoded)
+                done += 1
+                continue
+
+            pending[digest] = [xref]
+            payloads.append(extracted)
+
+        checkpoint(progress, cancel, "images", done, len(xrefs), self._stats.bytes_saved)
+        if not payloads:
             return
 
-        image_bytes = img_data["image"]
-        original_ext = img_data.get("ext", "jpeg")
-        
-        img = Image.open(BytesIO(image_bytes))
-        original_size = len(image_bytes)
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self._workers)
+        results = self._executor.map(
+            _encode_image_safe,
+            [image_bytes for image_bytes, _ in payloads],
+            [self._level.quality] * len(payloads),
+            [self._level.scale] * len(payloads),
+            [self._level.resample] * len(payloads),
+            [smask_bytes for _, smask_bytes in payloads],
+            [self._level.quantize] * len(payloads),
+        )
+        for (digest, targets), (succeeded, encoded) in zip(pending.items(), results):
+            self._remember(digest, encoded, succeeded)
+            if encoded is not None:
+                for xref in targets:
+                    self._apply_image_safe(doc, xref, encoded)
+            done += len(targets)
+            checkpoint(progress, cancel, "images", done, len(xrefs), self._stats.bytes_saved)
+
+    def _skip(self, reason: str) -> None:
+        self._stats.skipped[reason] = self._stats.skipped.get(reason, 0) + 1
+
+    def _lookup(self, digest: str) -> tuple[bool, EncodedImage | None]:
+        """Find a previous encoding of the image content, in this run or in the cache."""
+        if digest in self._encoded:
+            self._stats.duplicate_images += 1
+            return True, self._encoded[digest]
 
-        if img.mode in ("RGBA", "P"):
-            img = img.convert("RGB")
+        if self._cache is None:
+            return False, None
 
-        if self._level.scale < 1.0:
-            new_size = (int(img.width * self._level.scale), int(img.height * self._level.scale))
-            img = img.resize(new_size, Image.Resampling.LANCZOS)
+        cached = self._cache.get(self._cache.make_key(digest, self._level.name))
+        if cached is None:
+            self._stats.cache_misses += 1
+            return False, None
 
-        buffer = BytesIO()
-        img.save(buffer, format="JPEG", quality=self._level.quality, optimize=True)
-        compressed_data = buffer.getvalue()
+        self._stats.cache_hits += 1
+        # Images that do not shrink are cached with empty data.
+        encoded = cached if cached.data else None
+        self._encoded[digest] = encoded
+        return True, encoded
 
-        if len(compressed_data) >= original_size:
+    def _remember(self, digest: str, encoded: EncodedImage | None, succeeded: bool = True) -> None:
+        """
+        Keep an encoding for identical images later in the run and, unless
+        encoding failed, in the cache. A failure may be transient, e.g. a
+        MemoryError, so it must not mark the image as not worth
+        recompressing for later runs.
+        """
+        self._encoded[digest] = encoded
+        if self._cache is None or not succeeded:
             return
 
-        doc.update_stream(xref, compressed_data, compress=False)
-        doc.xref_set_key(xref, "Filter", "/DCTDecode")
-        doc.xref_set_key(xref, "ColorSpace", "/DeviceRGB")
-        doc.xref_set_key(xref, "Width", str(img.width))
-        doc.xref_set_key(xref, "Height", str(img.height))
-        doc.xref_set_key(xref, "BitsPerComponent", "8")
-        doc.xref_set_key(xref, "Length", str(len(compressed_data)))
\ No newline at end of file
+        try:
+            self._cache.put(self._cache.make_key(digest, self._level.name), encoded or EncodedImage(b"", 0, 0))
+        except OSError:
+            pass
+
+    def _apply_image_safe(self, doc: "fitz.Document", xref: int, encoded: EncodedImage) -> None:
+        try:
+            self._apply_image(doc, xref, encoded)
+        except Exception:
+            pass
+
+    def _apply_image(self, doc: "fitz.Document", xref: int, encoded: EncodedImage) -> None:
+        original_length = _stream_length(doc, xref)
+        _write_image(doc, xref, encoded)
+        self._stats.images_compressed += 1
+        self._stats.bytes_saved += original_length - len(encoded.data)
+
+        if not encoded.smask:
+            return
+        smask_xref = _smask_xref(doc, xref)
+        if smask_xref:
+            original_length = _stream_length(doc, smask_xref)
+        else:
+            # Transparency of the image itself, which the color key mask
+            # dropped by _write_image held
+            smask_xref = doc.get_new_xref()
+            doc.update_object(smask_xref, "<< /Type /XObject /Subtype /Image >>")
+            doc.xref_set_key(xref, "SMask", f"{smask_xref} 0 R")
+            original_length = 0
+        _write_image(
+            doc,
+            smask_xref,
+            EncodedImage(encoded.smask, encoded.width, encoded.height, "/FlateDecode", "/DeviceGray"),
+        )
+        self._stats.bytes_saved += original_length - len(encoded.smask)
+
+
+def _extract_image(doc: "fitz.Document", xref: int) -> tuple[bytes, bytes | None] | None:
+    """Extracted bytes of an image and of its soft mask, if it has one."""
+    img_data = doc.extract_image(xref)
+    if not img_data:
+        return None
+    smask_data = doc.extract_image(img_data["smask"]) if img_data.get("smask") else None
+    return img_data["image"], smask_data["image"] if smask_data else None
+
+
+def _smask_xref(doc: "fitz.Document", xref: int) -> int | None:
+    kind, value = doc.xref_get_key(xref, "SMask")
+    return int(value.split()[0]) if kind == "xref" else None
+
+
+def _image_digest(image_bytes: bytes, smask_bytes: bytes | None) -> str:
+    digest = hashlib.sha256(image_bytes)
+    if smask_bytes:
+        digest.update(smask_bytes)
+    return digest.hexdigest()
+
+
+def _write_image(doc: "fitz.Document", xref: int, encoded: EncodedImage) -> None:
+    """Replace an image stream and the dictionary entries describing its encoding."""
+    encoding_changed = (
+        doc.xref_get_key(xref, "Filter")[1] != encoded.filter
+        or doc.xref_get_key(xref, "ColorSpace")[1] != encoded.colorspace
+        or doc.xref_get_key(xref, "BitsPerComponent")[1] != str(encoded.bits_per_component)
+    )
+    doc.update_stream(xref, encoded.data, compress=False)
+    doc.xref_set_key(xref, "Filter", encoded.filter)
+    # Parameters of the previous filter, e.g. PNG predictors. A null value
+    # is written out, so keys that are not there are left alone.
+    _remove_key(doc, xref, "DecodeParms")
+    # The decode array maps sample values of the previous encoding.
+    if encoding_changed:
+        _remove_key(doc, xref, "Decode")
+    # A color key mask lists sample values too, and re-encoding changes
+    # them even in the same encoding; the pixels it hid are extracted as
+    # transparent and written to a soft mask instead (see _with_smask).
+    if doc.xref_get_key(xref, "Mask")[0] == "array":
+        doc.xref_set_key(xref, "Mask", "null")
+    doc.xref_set_key(xref, "ColorSpace", encoded.colorspace)
+    doc.xref_set_key(xref, "Width", str(encoded.width))
+    doc.xref_set_key(xref, "Height", str(encoded.height))
+    doc.xref_set_key(xref, "BitsPerComponent", str(encoded.bits_per_component))
+    doc.xref_set_key(xref, "Length", str(len(encoded.data)))
+
+
+def _remove_key(doc: "fitz.Document", xref: int, key: str) -> None:
+    if doc.xref_get_key(xref, key)[0] != "null":
+        doc.xref_set_key(xref, key, "null")
+
+
+def _stream_length(doc: "fitz.Document", xref: int) -> int:
+    """Length of a stream as stored in the file."""
+    kind, value = doc.xref_get_key(xref, "Length")
+    if kind == "int":
+        return int(value)
+    return len(doc.xref_stream_raw(xref))
+
+
+def _skip_reason(doc: "fitz.Document", xref: int, quality: int | None, scale: float) -> str | None:
+    """
+    Why re-encoding an image cannot pay off, judged from its stored size and
+    dictionary before decoding it.
+
+    Args:
+        quality: JPEG quality that would be used, or None to only skip
+            images no JPEG can represent profitably
+        scale: Scale factor that would be applied
+
+    Returns:
+        "tiny", "bilevel", "low_bytes_per_pixel" or "low_quality_jpeg", or
+        None if the image should be tried
+    """
+    length = _stream_length(doc, xref)
+    if length < _MIN_IMAGE_BYTES:
+        return "tiny"
+
+    # One bit per pixel scans and stencil masks are stored far more
+    # compactly than any 8-bit JPEG, and JPEG smears their edges.
+    filters = doc.xref_get_key(xref, "Filter")[1]
+    if (
+        "JBIG2Decode" in filters
+        or "CCITTFaxDecode" in filters
+        or doc.xref_get_key(xref, "ImageMask")[1] == "true"
+        or doc.xref_get_key(xref, "BitsPerComponent")[1] == "1"
+    ):
+        return "bilevel"
+
+    # Images stored losslessly are also tried as a palette, which can beat
+    # any JPEG on flat content, so the remaining checks only apply to JPEGs.
+    if quality is None or filters != "/DCTDecode":
+        return None
+
+    try:
+        pixels = int(doc.xref_get_key(xref, "Width")[1]) * int(doc.xref_get_key(xref, "Height")[1])
+    except ValueError:
+        return None
+    if length < pixels * scale * scale * _MIN_BYTES_PER_PIXEL:
+        return "low_bytes_per_pixel"
+
+    source_quality = _jpeg_quality(doc.xref_stream_raw(xref))
+    if source_quality is not None:
+        # Re-encoding at or above the source quality does not make a JPEG
+        # smaller per pixel, so only downscaling would save anything.
+        ratio = min(1.0, _jpeg_relative_size(quality) / _jpeg_relative_size(source_quality))
+        if ratio * scale * scale > 1 - _MIN_SAVING:
+            return "low_quality_jpeg"
+
+    return None
+
+
+def _jpeg_quality(jpeg_bytes: bytes) -> int | None:
+    """Estimate the quality a JPEG was written with from its luminance quantization table."""
+    from PIL import Image
+
+    try:
+        # Opening only parses the headers; the pixels are not decoded.
+        tables = Image.open(BytesIO(jpeg_bytes)).quantization
+    except Exception:
+        return None
+    if not tables or 0 not in tables:
+        return None
+
+    # Inverse of the IJG scaling: table = std * (5000 / q or 200 - 2q) / 100
+    scaling = 100 * sum(tables[0]) / _STD_LUMINANCE_TABLE_SUM
+    if scaling <= 100:
+        return max(1, min(100, round((200 - scaling) / 2)))
+    return max(1, round(5000 / scaling))
+
+
+def _jpeg_relative_size(quality: int) -> float:
+    """Interpolate _JPEG_RELATIVE_SIZE, clamped to its range."""
+    qualities = sorted(_JPEG_RELATIVE_SIZE)
+    quality = max(qualities[0], min(qualities[-1], quality))
+    for low, high in zip(qualities, qualities[1:]):
+        if quality <= high:
+            fraction = (quality - low) / (high - low)
+            return _JPEG_RELATIVE_SIZE[low] + fraction * (_JPEG_RELATIVE_SIZE[high] - _JPEG_RELATIVE_SIZE[low])
+    return _JPEG_RELATIVE_SIZE[qualities[-1]]
+
+
+def _size_without(doc: "fitz.Document", skipped: set[int]) -> int:
+    """Approximate saved size of the objects of a document other than skipped."""
+    size = 0
+    for xref in range(1, doc.xref_length()):
+        if xref in skipped:
+            continue
+        stream_length = _stream_length(doc, xref) if doc.xref_is_stream(xref) else 0
+        size += saved_object_size(doc.xref_object(xref, compressed=True), stream_length)
+    return size
+
+
+def _decode_image(image_bytes: bytes, scale: float = 1.0, resample: str = "LANCZOS"):
+    """
+    Decode an extracted image into a Pillow image that can be saved as JPEG,
+    downscaled by scale.
+
+    JPEGs are decoded in draft mode: libjpeg scales them by 1/2, 1/4 or 1/8
+    in the DCT domain while decoding, to no less than the target size, so
+    the full resolution image is never held in memory and only the small
+    remaining step is resampled.
+    """
+    # Imported here, so only processes that recompress images load Pillow.
+    from PIL import Image
+
+    img = Image.open(BytesIO(image_bytes))
+    size = (int(img.width * scale), int(img.height * scale))
+    box = None
+    if scale < 1.0 and img.format == "JPEG":
+        drafted = img.draft(None, size)
+        if drafted is not None:
+            # Region of the drafted image matching the original, which the
+            # rounded-up drafted size can slightly exceed
+            box = drafted[1]
+    img = _jpeg_mode(img)
+    if scale >= 1.0:
+        return img
+    return img.resize(size, Image.Resampling[resample], box=box)
+
+
+def _jpeg_mode(img):
+    """
+    Convert an image to the JPEG mode matching its content: L for grayscale,
+    including RGB images whose channels are all equal, and RGB otherwise.
+    """
+    from PIL import ImageChops
+
+    if img.mode not in _DECODABLE_MODES:
+        raise ValueError(f"Unsupported image mode: {img.mode}")
+    if img.mode in ("1", "L", "LA"):
+        return img.convert("L")
+    if img.mode != "RGB":
+        img = img.convert("RGB")
+    red, green, blue = img.split()
+    if ImageChops.difference(red, green).getbbox() is None and ImageChops.difference(red, blue).getbbox() is None:
+        return red
+    return img
+
+
+def _scaled(img, scale: float, resample: str = "LANCZOS"):
+    from PIL import Image
+
+    if scale >= 1.0:
+        return img
+    new_size = (int(img.width * scale), int(img.height * scale))
+    return img.resize(new_size, Image.Resampling[resample])
+
+
+def _jpeg(img, quality: int) -> bytes:
+    buffer = BytesIO()
+    img.save(buffer, format="JPEG", quality=quality, optimize=True)
+    return buffer.getvalue()
+
+
+def _jpeg_image(img, quality: int) -> EncodedImage:
+    return EncodedImage(_jpeg(img, quality), img.width, img.height, colorspace=_JPEG_COLORSPACES[img.mode])
+
+
+def _bilevel_image(img) -> EncodedImage:
+    """Flate encode a two-tone image with one bit per pixel."""
+    from PIL import Image
+
+    bilevel = img.convert("1", dither=Image.Dither.NONE)
+    # Pillow stores white as 1, as does DeviceGray with one bit per component.
+    return EncodedImage(
+        zlib.compress(bilevel.tobytes(), 9), img.width, img.height,
+        filter="/FlateDecode", colorspace="/DeviceGray", bits_per_component=1,
+    )
+
+
+def _palette_image(img, exact: bool) -> EncodedImage | None:
+    """
+    Flate encode an RGB image as indexed colors, with as few bits per pixel
+    as the palette allows.
+
+    Args:
+        exact: Only succeed if the palette represents every pixel exactly;
+            otherwise an image with a few thousand colors at most is
+            reduced to its 256 most important ones
+
+    Returns:
+        The encoded image, or None if the image has too many colors
+    """
+    from PIL import Image, ImageChops
+
+    if img.getcolors(256 if exact else _MAX_QUANTIZED_COLORS) is None:
+        return None
+    paletted = img.quantize(256, dither=Image.Dither.NONE)
+    if exact and ImageChops.difference(paletted.convert("RGB"), img).getbbox() is not None:
+        return None
+
+    colors = max(index for _, index in paletted.getcolors(256)) + 1
+    bits = next(bits for bits in (1, 2, 4, 8) if colors <= 1 << bits)
+    samples = paletted.tobytes("raw", f"P;{bits}") if bits < 8 else paletted.tobytes()
+    lookup = bytes(paletted.getpalette("RGB")[:3 * colors]).hex()
+    return EncodedImage(
+        zlib.compress(samples, 9), img.width, img.height,
+        filter="/FlateDecode",
+        colorspace=f"[/Indexed /DeviceRGB {colors - 1} <{lookup}>]",
+        bits_per_component=bits,
+    )
+
+
+def _lossless_images(img) -> list[EncodedImage]:
+    """
+    Flate encodings keeping every pixel of an image converted by _jpeg_mode():
+    one bit per pixel for black and white images, and indexed colors for
+    images with at most 256 colors.
+    """
+    if img.mode == "L" and not any(img.histogram()[1:255]):
+        return [_bilevel_image(img)]
+    if img.mode == "RGB":
+        palette = _palette_image(img, exact=True)
+        if palette is not None:
+            return [palette]
+    return []
+
+
+def _with_smask(encoded: EncodedImage, smask_bytes: bytes | None, source, resample: str):
+    """
+    Attach the soft mask a re-encoded image needs: its own soft mask, resized
+    if the image size changed, or for an image without one, its transparency
+    as extracted, e.g. the pixels a color key mask hides, which none of the
+    encodings keep.
+
+    Args:
+        source: The extracted image as opened by Pillow
+    """
+    from PIL import Image
+
+    size = (encoded.width, encoded.height)
+    if smask_bytes:
+        if size == source.size:
+            return encoded
+        mask = Image.open(BytesIO(smask_bytes)).convert("L")
+    elif "A" in source.getbands() or "transparency" in source.info:
+        mask = source.convert("RGBA").getchannel("A")
+        if mask.getextrema()[0] == 255:
+            return encoded
+    else:
+        return encoded
+    if mask.size != size:
+        mask = mask.resize(size, Image.Resampling[resample])
+    return replace(encoded, smask=zlib.compress(mask.tobytes(), 9))
+
+
+def _encode_image(
+    image_bytes: bytes,
+    quality: int,
+    scale: float,
+    resample: str = "LANCZOS",
+    smask_bytes: bytes | None = None,
+    quantize: bool = False,
+) -> EncodedImage | None:
+    """
+    Re-encode an extracted image with the smallest encoding suited to it.
+
+    The candidates are a JPEG of the downscaled image, grayscale if its
+    content is, and for images not stored as JPEG (whose artifacts lossless
+    encodings would only preserve) two Flate encodings at full resolution
+    that keep every pixel: one bit per pixel for black and white images and
+    indexed colors for images with at most 256 colors. With quantize, the
+    downscaled image reduced to a 256 color palette is tried as well. The
+    soft mask, if any, is resized with the image.
+
+    Kept at module level so it can run in worker processes.
+
+    Returns:
+        The encoded image, or None if no candidate is smaller than the
+        original
+    """
+    from PIL import Image
+
+    source = Image.open(BytesIO(image_bytes))
+    candidates = []
+    if source.format == "JPEG":
+        img = _decode_image(image_bytes, scale, resample)
+    else:
+        full = _jpeg_mode(source)
+        candidates.extend(_lossless_images(full))
+        img = _scaled(full, scale, resample)
+
+    candidates.append(_jpeg_image(img, quality))
+    if quantize and img.mode == "RGB":
+        candidates.append(_palette_image(img, exact=False))
+
+    best = min((candidate for candidate in candidates if candidate is not None), key=lambda c: len(c.data))
+    if len(best.data) >= len(image_bytes):
+        return None
+
+    return _with_smask(best, smask_bytes, source, resample)
+
+
+def _search_encoding(
+    image_bytes: bytes,
+    budget: int,
+    original_length: int,
+    smask_bytes: bytes | None = None,
+    smask_length: int = 0,
+) -> tuple[EncodedImage, int | None, float, int] | None:
+    """
+    Find the best encoding of an image within budget bytes.
+
+    The candidates are those of _encode_image(): for images not stored as
+    JPEG, the lossless encodings at full resolution, and the JPEG with the
+    highest quality (and then the largest scale) that fits, found by binary
+    search. The smallest candidate that fits is kept, or if none does, the
+    smallest one. The image is decoded once and each scale resized once.
+
+    Sizes include the soft mask: a resized one as re-encoded, and one that
+    is kept as it is with its stored smask_length, which original_length
+    includes too.
+
+    Returns:
+        Tuple of (encoded image, JPEG quality or None if lossless, scale,
+        size), or None if no encoding is smaller than original_length
+    """
+    from PIL import Image
+
+    source = Image.open(BytesIO(image_bytes))
+    img = _decode_image(image_bytes)
+
+    def stored_size(encoded: EncodedImage) -> int:
+        return len(encoded.data) + (len(encoded.smask) if encoded.smask else smask_length)
+
+    candidates: list[tuple[EncodedImage, int | None, float]] = []
+    if source.format != "JPEG":
+        candidates.extend(
+            (_with_smask(encoded, smask_bytes, source, "LANCZOS"), None, 1.0) for encoded in _lossless_images(img)
+        )
+
+    for scale in _TARGET_SCALES:
+        scaled = _scaled(img, scale)
+        # Binary search for the highest quality that fits; lo always fits
+        # once the lowest quality is known to. The soft mask only depends
+        # on the scale.
+        lowest = _with_smask(_jpeg_image(scaled, _TARGET_QUALITIES[0]), smask_bytes, source, "LANCZOS")
+        best = (lowest, _TARGET_QUALITIES[0], scale)
+        if stored_size(lowest) > budget:
+            continue
+
+        lo, hi = 0, len(_TARGET_QUALITIES) - 1
+        while lo < hi:
+            mid = (lo + hi + 1) // 2
+            encoded = replace(_jpeg_image(scaled, _TARGET_QUALITIES[mid]), smask=lowest.smask)
+            if stored_size(encoded) <= budget:
+                lo = mid
+                best = (encoded, _TARGET_QUALITIES[mid], scale)
+            else:
+                hi = mid - 1
+        break
+    # Without a break, best is the smallest JPEG tried.
+    candidates.append(best)
+
+    fitting = [candidate for candidate in candidates if stored_size(candidate[0]) <= budget]
+    encoded, quality, scale = min(fitting or candidates, key=lambda candidate: stored_size(candidate[0]))
+    size = stored_size(encoded)
+    if size >= original_length:
+        return None
+    return encoded, quality, scale, size
+
+
+def _encode_image_safe(
+    image_bytes: bytes,
+    quality: int,
+    scale: float,
+    resample: str = "LANCZOS",
+    smask_bytes: bytes | None = None,
+    quantize: bool = False,
+) -> tuple[bool, EncodedImage | None]:
+    """
+    Worker-side counterpart of the per-image try/except in the serial path.
+
+    Returns:
+        Tuple of (whether encoding succeeded, result of _encode_image())
+    """
+    try:
+        return True, _encode_image(image_bytes, quality, scale, resample, smask_bytes, quantize)
+    except Exception:
+        return False, None
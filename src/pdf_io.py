@@ -0,0 +1,151 @@
+import os
+from dataclasses import dataclass
+from io import BytesIO
+from pathlib import Path
+from typing import TYPE_CHECKING, BinaryIO, Union
+
+if TYPE_CHECKING:
+    import fitz
+
+# A PDF can be given as a path on disk or as an in-memory buffer.
+PdfSource = Union[Path, bytes, bytearray, memoryview, BinaryIO]
+# Where a PDF is written: a path, a writable binary stream, or None for bytes.
+PdfTarget = Union[Path, BinaryIO, None]
+PdfResult = Union[Path, bytes, BinaryIO]
+
+
+@dataclass(frozen=True)
+class SaveProfile:
+    """
+    How the engines write their output files, on top of the cleanup options
+    (garbage collection, content stream cleaning) each engine chooses.
+
+    Linearization ("fast web view") is not offered: MuPDF dropped support
+    for writing it.
+    """
+
+    # Pack objects other than streams into compressed object streams, with
+    # a compressed cross-reference stream instead of the classic table. Can
+    # be read by PDF 1.5 and later readers.
+    use_objstms: bool = False
+    # Compress embedded fonts stored without compression
+    deflate_fonts: bool = False
+    # Compress images stored without compression
+    deflate_images: bool = False
+
+    @staticmethod
+    def named(name: str) -> "SaveProfile":
+        """Look up one of SAVE_PROFILES by name."""
+        try:
+            return SAVE_PROFILES[name.lower()]
+        except KeyError:
+            raise ValueError(f"Unknown save profile: {name}. Choose from: {', '.join(SAVE_PROFILES)}") from None
+
+    def save_options(self) -> dict[str, bool]:
+        return {
+            "use_objstms": self.use_objstms,
+            "deflate_fonts": self.deflate_fonts,
+            "deflate_images": self.deflate_images,
+        }
+
+
+SAVE_PROFILES = {
+    # Classic cross-reference table, as every PDF reader understands
+    "classic": SaveProfile(),
+    # Also compress fonts and images that were stored uncompressed
+    "deflate": SaveProfile(deflate_fonts=True, deflate_images=True),
+    # Smallest output: compressed object and cross-reference streams as well
+    "compact": SaveProfile(use_objstms=True, deflate_fonts=True, deflate_images=True),
+}
+
+
+def open_pdf(source: PdfSource) -> "fitz.Document":
+    """Open a PDF from a path or an in-memory buffer without copying it to disk."""
+    # PyMuPDF is imported on first use rather than with this module, so
+    # commands that never open a PDF (e.g. --help) start without it.
+    import fitz
+
+    if isinstance(source, Path):
+        return fitz.open(source)
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return fitz.open(stream=source, filetype="pdf")
+    if isinstance(source, BytesIO):
+        # Independent of the stream position, so the buffer can be reopened.
+        return fitz.open(stream=source.getbuffer(), filetype="pdf")
+    return fitz.open(stream=source.read(), filetype="pdf")
+
+
+def new_pdf() -> "fitz.Document":
+    """Create an empty PDF to insert pages into."""
+    import fitz
+
+    return fitz.open()
+
+
+def shareable_source(source: PdfSource) -> Path | bytes:
+    """
+    The source in a form that can be sent to worker processes.
+
+    Paths are kept, so every worker opens the file itself and the pages are
+    shared through the OS page cache; buffers and streams become bytes.
+    """
+    if isinstance(source, (Path, bytes)):
+        return source
+    if isinstance(source, (bytearray, memoryview)):
+        return bytes(source)
+    if isinstance(source, BytesIO):
+        return source.getvalue()
+    return source.read()
+
+
+def source_stem(source: PdfSource, default: str = "document") -> str:
+    """Base name used for files derived from a source."""
+    if isinstance(source, Path):
+        return source.stem
+    return default
+
+
+def make_private_dir(directory: Path) -> None:
+    """
+    Create a directory only the current user can access, along with any
+    missing parents, refusing an existing one another user could write to.
+    """
+    # mkdir(parents=True) would create the parents with the default mode.
+    for parent in reversed([directory, *directory.parents]):
+        if not parent.exists():
+            parent.mkdir(mode=0o700, exist_ok=True)
+    info = directory.stat()
+    if hasattr(os, "getuid") and (info.st_uid != os.getuid() or info.st_mode & 0o077):
+        raise RuntimeError(f"{directory} must belong to the current user and be private to them")
+
+
+def saved_object_size(source: str, stream_length: int = 0) -> int:
+    """Approximate bytes an object takes in a saved file, from its compact source and stream length."""
+    # Object header, trailer and cross-reference entry
+    return 40 + len(source) + stream_length
+
+
+def save_pdf(
+    doc: "fitz.Document",
+    target: PdfTarget,
+    profile: SaveProfile | None = None,
+    **save_options,
+) -> PdfResult:
+    """
+    Save a document to a path, a binary stream, or into memory.
+
+    Args:
+        profile: Output format options; the classic format if None
+        save_options: Further options of fitz.Document.save()
+
+    Returns:
+        The path or stream that was written, or the PDF bytes if target is None
+    """
+    if profile is not None:
+        save_options = {**profile.save_options(), **save_options}
+    if target is None:
+        return doc.tobytes(**save_options)
+    if isinstance(target, Path):
+        target.parent.mkdir(parents=True, exist_ok=True)
+    doc.save(target, **save_options)
+    return target
@@ -1,31 +1,368 @@
+import os
+import sys
+import tempfile
+from dataclasses import dataclass
 from pathlib import Path
+from typing import TYPE_CHECKING
 
-import fitz
+from .pdf_compressor import PdfCompressor
+from .pdf_io import PdfResult, PdfSource, PdfTarget, SaveProfile, new_pdf, open_pdf, save_pdf, shareable_source
+from .progress import CancelToken, ProgressCallback, checkpoint, contiguous_batches, worker_pool
+from .stream_dedup import deduplicate_streams
+
+if TYPE_CHECKING:
+    import fitz
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+@dataclass
+class MergeStats:
+    """Counters collected during a merge."""
+
+    files: int = 0
+    pages: int = 0
+    batches: int = 0  # Times the merged document was flushed to disk (streaming only)
+    duplicates: int = 0  # Objects collapsed into an identical copy (deduplicate only)
+    dedup_bytes_saved: int = 0  # Stream data and object source those duplicates held
+    # Peak resident set size of the process so far, in bytes; None where the
+    # platform does not report it. Covers the whole process lifetime, so
+    # compare runs in fresh processes.
+    peak_rss_bytes: int | None = None
 
 
 class PdfMerger:
-    def merge(self, input_files: list[Path], output_file: Path) -> Path:
+    def __init__(self, save_profile: SaveProfile | None = None):
+        """
+        Args:
+            save_profile: Format of the merged files; intermediate files are
+                always written in the classic format
+        """
+        self._save_profile = save_profile
+        self._stats = MergeStats()
+
+    @property
+    def stats(self) -> MergeStats:
+        """Statistics of the most recent merge."""
+        return self._stats
+
+    def merge(
+        self,
+        input_files: list[PdfSource],
+        output_file: PdfTarget = None,
+        compressor: PdfCompressor | None = None,
+        progress: ProgressCallback | None = None,
+        cancel: CancelToken | None = None,
+        batch_size: int | None = None,
+        workers: int = 1,
+        deduplicate: bool = False,
+    ) -> PdfResult:
+        """
+        Merge PDF files into one.
+
+        Bookmarks of every input are kept, pointing at the pages' new
+        positions, and so are links between pages of the same input.
+
+        Args:
+            input_files: PDF files to merge, in order, as paths or buffers
+            output_file: Path or stream for the merged PDF, or None to
+                return it as bytes
+            compressor: If given, images of each source are recompressed as
+                soon as it is inserted, and the result is saved once with
+                full garbage collection instead of being written, reopened
+                and compressed in a second pass
+            progress: Optional callback receiving a "files" event after each
+                input file, with the bytes saved so far when compressing.
+                With several workers, "files" events follow finished groups
+                and "parts" events the final merge of the groups.
+            cancel: Optional token checked after each input file and, when
+                compressing, after each image
+            batch_size: If given, merge in streaming mode: the merged
+                document is appended to a work file on disk after every
+                batch_size inputs and reopened, so memory stays bounded by
+                one batch instead of growing with the whole result. The work
+                file is compacted into the output at the end. Merges of at
+                most batch_size inputs are done in memory.
+            workers: Number of processes merging contiguous groups of inputs
+                into partial files, which are then merged in order (a
+                two-level tree reduce). Images are recompressed during the
+                final merge.
+            deduplicate: If True, identical fonts, ICC profiles, images and
+                the objects referring to them are collapsed into one copy
+                before saving, so inputs from the same generator do not each
+                carry their own
+
+        Returns:
+            The written path or stream, or the merged PDF bytes
+
+        Raises:
+            OperationCancelled: If cancel was cancelled
+        """
         if len(input_files) < 2:
             raise ValueError("At least 2 PDF files are required for merging")
+        if batch_size is not None and batch_size < 1:
+            raise ValueError("Batch size must be at least 1")
+        if workers < 1:
+            raise ValueError("Workers must be at least 1")
 
         self._validate_files(input_files)
 
-        result = fitz.open()
+        self._stats = MergeStats()
+        if compressor is not None:
+            compressor.reset()
+
+        try:
+            if workers > 1 and len(input_files) > 2:
+                output = self._merge_parallel(
+                    input_files, output_file, compressor, progress, cancel, batch_size, workers, deduplicate
+                )
+            else:
+                output = self._merge_sources(
+                    input_files, output_file, compressor, progress, cancel, batch_size, "files", deduplicate
+                )
+        finally:
+            # The compressor's worker processes serve every input of the merge.
+            if compressor is not None:
+                compressor.close()
+
+        self._stats.files = len(input_files)
+        self._stats.peak_rss_bytes = _peak_rss()
+        return output
+
+    def _merge_sources(
+        self,
+        sources: list[PdfSource],
+        output_file: PdfTarget,
+        compressor: PdfCompressor | None,
+        progress: ProgressCallback | None,
+        cancel: CancelToken | None,
+        batch_size: int | None,
+        stage: str,
+        deduplicate: bool,
+    ) -> PdfResult:
+        # A single batch would only add a save and reparse of the work file.
+        if batch_size is None or len(sources) <= batch_size:
+            return self._merge_in_memory(sources, output_file, compressor, progress, cancel, stage, deduplicate)
+        return self._merge_streaming(
+            sources, output_file, compressor, progress, cancel, batch_size, stage, deduplicate
+        )
+
+    def _merge_in_memory(
+        self,
+        sources: list[PdfSource],
+        output_file: PdfTarget,
+        compressor: PdfCompressor | None,
+        progress: ProgressCallback | None,
+        cancel: CancelToken | None,
+        stage: str,
+        deduplicate: bool,
+    ) -> PdfResult:
+        toc: list[list] = []
+        result = new_pdf()
+        try:
+            checkpoint(progress, cancel, stage, 0, len(sources))
+            for done, source in enumerate(sources, start=1):
+                self._append(result, source, compressor, cancel, toc)
+                checkpoint(progress, cancel, stage, done, len(sources), _bytes_saved(compressor))
+
+            _set_toc(result, toc)
+            if deduplicate:
+                self._deduplicate(result)
+            if compressor is not None:
+                output = save_pdf(result, output_file, self._save_profile, garbage=4, deflate=True, clean=True)
+            elif deduplicate:
+                # Drop the copies no longer referenced and renumber the
+                # remaining objects, so the xref table loses their entries.
+                output = save_pdf(result, output_file, self._save_profile, garbage=2)
+            else:
+                output = save_pdf(result, output_file, self._save_profile)
+        finally:
+            result.close()
+
+        return output
+
+    def _merge_streaming(
+        self,
+        sources: list[PdfSource],
+        output_file: PdfTarget,
+        compressor: PdfCompressor | None,
+        progress: ProgressCallback | None,
+        cancel: CancelToken | None,
+        batch_size: int,
+        stage: str,
+        deduplicate: bool,
+    ) -> PdfResult:
+        # The work file sits next to the output when there is one, so the
+        # intermediate data lands on the same disk.
+        fd, work_name = tempfile.mkstemp(suffix=".pdf", dir=_work_dir(output_file))
+        os.close(fd)
+        work_path = Path(work_name)
+
+        toc: list[list] = []
+        try:
+            checkpoint(progress, cancel, stage, 0, len(sources))
+            for batch_start in range(0, len(sources), batch_size):
+                result = open_pdf(work_path) if batch_start else new_pdf()
+                try:
+                    batch = sources[batch_start:batch_start + batch_size]
+                    for done, source in enumerate(batch, start=batch_start + 1):
+                        self._append(result, source, compressor, cancel, toc)
+                        checkpoint(progress, cancel, stage, done, len(sources), _bytes_saved(compressor))
+                    # Appending only the new objects keeps each flush
+                    # proportional to the batch; closing the document drops
+                    # them from memory.
+                    if batch_start:
+                        result.saveIncr()
+                    else:
+                        result.save(work_path)
+                finally:
+                    result.close()
+                self._stats.batches += 1
+
+            # Rewrite the work file without the superseded page tree
+            # revisions. Objects are loaded one at a time while writing;
+            # clean=True is left out because it parses every content stream
+            # into memory at once.
+            result = open_pdf(work_path)
+            try:
+                _set_toc(result, toc)
+                if deduplicate:
+                    self._deduplicate(result)
+                if compressor is not None:
+                    output = save_pdf(result, output_file, self._save_profile, garbage=4, deflate=True)
+                else:
+                    output = save_pdf(result, output_file, self._save_profile, garbage=2 if deduplicate else 1)
+            finally:
+                result.close()
+        finally:
+            work_path.unlink(missing_ok=True)
 
-        for pdf_path in input_files:
-            doc = fitz.open(pdf_path)
-            result.insert_pdf(doc)
-            doc.close()
+        return output
 
-        output_file.parent.mkdir(parents=True, exist_ok=True)
-        result.save(output_file)
-        result.close()
+    def _merge_parallel(
+        self,
+        input_files: list[PdfSource],
+        output_file: PdfTarget,
+        compressor: PdfCompressor | None,
+        progress: ProgressCallback | None,
+        cancel: CancelToken | None,
+        batch_size: int | None,
+        workers: int,
+        deduplicate: bool,
+    ) -> PdfResult:
+        # Order is kept by merging the partial files in group order.
+        groups = [
+            [shareable_source(source) for source in group]
+            for group in contiguous_batches(input_files, workers, _GROUPS_PER_WORKER)
+        ]
 
-        return output_file
+        with tempfile.TemporaryDirectory(dir=_work_dir(output_file)) as partial_dir:
+            partials = [Path(partial_dir) / f"part{idx:05d}.pdf" for idx in range(len(groups))]
 
-    def _validate_files(self, files: list[Path]) -> None:
+            with worker_pool(min(workers, len(groups))) as executor:
+                done = 0
+                checkpoint(progress, cancel, "files", done, len(input_files))
+                for merged in executor.map(_merge_group, groups, partials):
+                    done += merged
+                    checkpoint(progress, cancel, "files", done, len(input_files))
+
+            return self._merge_sources(
+                partials, output_file, compressor, progress, cancel, batch_size, "parts", deduplicate
+            )
+
+    def _append(
+        self,
+        result: "fitz.Document",
+        source: PdfSource,
+        compressor: PdfCompressor | None,
+        cancel: CancelToken | None,
+        toc: list[list],
+    ) -> None:
+        """Insert one input at the end of the merged document and collect its bookmarks."""
+        doc = open_pdf(source)
+        first_page = len(result)
+        result.insert_pdf(doc)
+        toc.extend(_shift_toc(doc.get_toc(simple=False), first_page))
+        doc.close()
+
+        self._stats.pages += len(result) - first_page
+
+        if compressor is not None:
+            compressor.compress_document(result, range(first_page, len(result)), cancel=cancel)
+
+    def _deduplicate(self, result: "fitz.Document") -> None:
+        duplicates, bytes_saved = deduplicate_streams(result)
+        self._stats.duplicates += duplicates
+        self._stats.dedup_bytes_saved += bytes_saved
+
+    def _validate_files(self, files: list[PdfSource]) -> None:
         for file in files:
+            if not isinstance(file, Path):
+                continue
             if not file.exists():
                 raise FileNotFoundError(f"File not found: {file}")
             if file.suffix.lower() != ".pdf":
                 raise ValueError(f"Not a PDF file: {file}")
+
+
+# Groups of inputs handed to each merge worker
+_GROUPS_PER_WORKER = 2
+
+
+def _merge_group(sources: list[Path | bytes], output_path: Path) -> int:
+    """Merge a group of inputs into a partial file, in a worker process; returns the number of inputs."""
+    PdfMerger()._merge_in_memory(sources, output_path, None, None, None, "files", False)
+    return len(sources)
+
+
+def _work_dir(output_file: PdfTarget) -> Path | None:
+    """Directory for intermediate files: next to the output, or the system default."""
+    if not isinstance(output_file, Path):
+        return None
+    output_file.parent.mkdir(parents=True, exist_ok=True)
+    return output_file.parent
+
+
+def _bytes_saved(compressor: PdfCompressor | None) -> int:
+    return compressor.stats.bytes_saved if compressor is not None else 0
+
+
+def _shift_toc(toc: list[list], offset: int) -> list[list]:
+    """Move bookmarks of an inserted document to its pages' positions in the result."""
+    shifted = []
+    for level, title, page, *dest in toc:
+        if page > 0:
+            page += offset
+        if dest:
+            dest = dict(dest[0])
+            # The outline item is recreated, and its target follows the page.
+            dest.pop("xref", None)
+            if dest.get("page", -1) >= 0:
+                dest["page"] = page - 1
+            shifted.append([level, title, page, dest])
+        else:
+            shifted.append([level, title, page])
+    return shifted
+
+
+def _set_toc(doc: "fitz.Document", toc: list[list]) -> None:
+    if not toc:
+        return
+    try:
+        doc.set_toc(toc)
+    except ValueError:
+        # An input with a malformed outline (e.g. not starting at level 1)
+        # must not fail the merge; the pages are merged without bookmarks.
+        pass
+
+
+def _peak_rss() -> int | None:
+    """Peak resident set size of this process so far, in bytes."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Reported in bytes on macOS and in kilobytes elsewhere.
+    return peak if sys.platform == "darwin" else peak * 1024
@@ -0,0 +1,165 @@
+import hashlib
+import zlib
+from dataclasses import dataclass, fields, replace
+from typing import TYPE_CHECKING, Iterable
+
+from .pdf_io import saved_object_size
+from .stream_dedup import references
+
+if TYPE_CHECKING:
+    import fitz
+
+
+@dataclass(frozen=True)
+class OptimizeOptions:
+    """Optimizations of the parts of a PDF other than its images, each of which can be turned off."""
+
+    # Drop file attachments
+    embedded_files: bool = True
+    # Drop the thumbnail images of pages
+    thumbnails: bool = True
+    # Drop the document information dictionary and XMP metadata
+    metadata: bool = True
+    # Reduce embedded fonts to the glyphs the document uses
+    fonts: bool = True
+    # Recompress page and form content streams at the highest zlib level
+    content_streams: bool = True
+
+    @classmethod
+    def names(cls) -> list[str]:
+        """Names of the optimizations, in the order they are applied."""
+        return [option.name for option in fields(cls)]
+
+    @classmethod
+    def all_except(cls, names: Iterable[str]) -> "OptimizeOptions":
+        """Options with every optimization enabled but the named ones."""
+        disabled = {}
+        for name in names:
+            if name not in cls.names():
+                raise ValueError(f"Unknown optimization: {name}. Choose from: {', '.join(cls.names())}")
+            disabled[name] = False
+        return replace(cls(), **disabled)
+
+
+def optimize_document(doc: "fitz.Document", options: OptimizeOptions) -> dict[str, int | None]:
+    """
+    Apply the enabled optimizations to an open document in place.
+
+    The page content streams are first cleaned as saving with clean=True
+    would, dropping the resources they do not use, so the document must be
+    saved without clean=True: cleaning again would rewrite the recompressed
+    streams. Objects that are no longer used are only unreferenced; saving
+    with garbage collection removes them.
+
+    Returns:
+        Bytes saved by each enabled optimization, by name, or None for one
+        that failed and was skipped. Savings are estimated from the size of
+        the objects reachable from the trailer before and after each one,
+        starting from the cleaned document, so they only count what a
+        default save would not have saved anyway. An object dropped by
+        several optimizations is credited to the first.
+    """
+    _clean_contents(doc)
+    saved = {}
+    size = _reachable_size(doc)
+    for name in OptimizeOptions.names():
+        if not getattr(options, name):
+            continue
+        if _STEPS[name](doc) is False:
+            saved[name] = None
+            continue
+        new_size = _reachable_size(doc)
+        saved[name] = size - new_size
+        size = new_size
+    return saved
+
+
+def _clean_contents(doc: "fitz.Document") -> None:
+    for page in doc:
+        page.clean_contents(sanitize=True)
+        # The rewritten stream is left uncompressed; compress it as saving
+        # would, so it is not counted as a saving of content_streams.
+        for xref in page.get_contents():
+            if doc.xref_get_key(xref, "Filter")[0] == "null":
+                doc.update_stream(xref, doc.xref_stream(xref), compress=True)
+
+
+def _remove_embedded_files(doc: "fitz.Document") -> None:
+    for name in doc.embfile_names():
+        doc.embfile_del(name)
+
+
+def _remove_thumbnails(doc: "fitz.Document") -> None:
+    for page in doc:
+        # Setting a key to null writes it out, so only pages with a
+        # thumbnail are touched.
+        if doc.xref_get_key(page.xref, "Thumb")[0] != "null":
+            doc.xref_set_key(page.xref, "Thumb", "null")
+
+
+def _remove_metadata(doc: "fitz.Document") -> None:
+    doc.set_metadata({})
+    doc.del_xml_metadata()
+
+
+def _subset_fonts(doc: "fitz.Document") -> bool:
+    try:
+        doc.subset_fonts()
+    except Exception:
+        # Reported as skipped rather than failing the whole compression.
+        return False
+    return True
+
+
+def _recompress_content_streams(doc: "fitz.Document") -> None:
+    xrefs = {xref for page in doc for xref in page.get_contents()}
+    xrefs.update(
+        xref for xref in range(1, doc.xref_length())
+        if doc.xref_is_stream(xref) and doc.xref_get_key(xref, "Subtype")[1] == "/Form"
+    )
+    for xref in sorted(xrefs):
+        compressed = zlib.compress(doc.xref_stream(xref), 9)
+        if len(compressed) >= len(doc.xref_stream_raw(xref)):
+            continue
+        doc.update_stream(xref, compressed, compress=False)
+        doc.xref_set_key(xref, "Filter", "/FlateDecode")
+        if doc.xref_get_key(xref, "DecodeParms")[0] != "null":
+            doc.xref_set_key(xref, "DecodeParms", "null")
+        doc.xref_set_key(xref, "Length", str(len(compressed)))
+
+
+_STEPS = {
+    "embedded_files": _remove_embedded_files,
+    "thumbnails": _remove_thumbnails,
+    "metadata": _remove_metadata,
+    "fonts": _subset_fonts,
+    "content_streams": _recompress_content_streams,
+}
+
+
+def _reachable_size(doc: "fitz.Document") -> int:
+    """
+    Approximate saved size of the objects reachable from the trailer, as
+    saving with garbage=4 and deflate=True writes them.
+    """
+    size = 0
+    seen: set[int] = set()
+    written: set[tuple[str, bytes]] = set()
+    pending = [int(match[1]) for match in references(doc.pdf_trailer())]
+    while pending:
+        xref = pending.pop()
+        if xref in seen or not 0 < xref < doc.xref_length():
+            continue
+        seen.add(xref)
+        source = doc.xref_object(xref, compressed=True)
+        pending.extend(int(match[1]) for match in references(source))
+        stream = doc.xref_stream_raw(xref) if doc.xref_is_stream(xref) else b""
+        # garbage=4 writes identical objects once.
+        key = (source, hashlib.sha256(stream).digest())
+        if key in written:
+            continue
+        written.add(key)
+        if stream and doc.xref_get_key(xref, "Filter")[0] == "null":
+            stream = zlib.compress(stream)
+        size += saved_object_size(source, len(stream))
+    return size
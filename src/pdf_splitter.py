@@ -1,119 +1,159 @@
 from pathlib import Path
+from typing import TYPE_CHECKING
 
-import fitz
+from .pdf_io import (
+    PdfResult,
+    PdfSource,
+    PdfTarget,
+    SaveProfile,
+    new_pdf,
+    open_pdf,
+    save_pdf,
+    shareable_source,
+    source_stem,
+)
+from .progress import CancelToken, ProgressCallback, checkpoint, contiguous_batches, worker_pool
+
+if TYPE_CHECKING:
+    import fitz
 
 
 class PdfSplitter:
+    def __init__(self, save_profile: SaveProfile | None = None):
+        """
+        Args:
+            save_profile: Format of the written files
+        """
+        self._save_profile = save_profile
+
     def split_by_pages(
         self, 
-        input_file: Path, 
-        output_dir: Path, 
-        page_ranges: list[tuple[int, int]]
-    ) -> list[Path]:
+        input_file: PdfSource, 
+        output_dir: Path | None, 
+        page_ranges: list[tuple[int, int]],
+        stem: str | None = None,
+        progress: ProgressCallback | None = None,
+        cancel: CancelToken | None = None,
+        workers: int = 1,
+    ) -> list[Path] | list[tuple[str, bytes]]:
         """
         Split a PDF into multiple files based on page ranges.
         
         Args:
-            input_file: Path to the input PDF file
-            output_dir: Directory where split files will be saved
+            input_file: Path or in-memory buffer of the input PDF
+            output_dir: Directory where split files will be saved, or None
+                to return them in memory
             page_ranges: List of tuples (start_page, end_page), 1-indexed inclusive
+            stem: Base name for output files, defaults to the input file
+                name (or "document" for buffers)
+            progress: Optional callback receiving a "files" event after
+                each output file
+            cancel: Optional token checked after each output file
+            workers: Number of processes used to build and write the output
+                files. With more than one worker, each worker opens the
+                source once and writes a contiguous share of the ranges.
             
         Returns:
-            List of paths to the created PDF files
+            List of paths to the created PDF files, or of (file name, PDF
+            bytes) pairs if output_dir is None, in the order of page_ranges
         """
         self._validate_file(input_file)
-        output_dir.mkdir(parents=True, exist_ok=True)
-        
-        doc = fitz.open(input_file)
-        total_pages = len(doc)
-        output_files = []
-        
-        for idx, (start, end) in enumerate(page_ranges):
-            # Convert to 0-indexed
-            start_idx = start - 1
-            end_idx = end - 1
-            
-            if start_idx < 0 or end_idx >= total_pages or start_idx > end_idx:
-                doc.close()
-                raise ValueError(
-                    f"Invalid page range ({start}-{end}). "
-                    f"Document has {total_pages} pages."
-                )
-            
-            # Create new document with selected pages
-            new_doc = fitz.open()
-            new_doc.insert_pdf(doc, from_page=start_idx, to_page=end_idx)
-            
-            # Generate output filename
-            stem = input_file.stem
-            if len(page_ranges) == 1:
-                output_name = f"{stem}_pages_{start}-{end}.pdf"
-            else:
-                output_name = f"{stem}_part{idx + 1}_pages_{start}-{end}.pdf"
-            
-            output_path = output_dir / output_name
-            new_doc.save(output_path)
-            new_doc.close()
-            output_files.append(output_path)
+        if workers < 1:
+            raise ValueError("Workers must be at least 1")
+        if workers > 1:
+            input_file = shareable_source(input_file)
         
-        doc.close()
-        return output_files
+        doc = open_pdf(input_file)
+        try:
+            return self._split_document(
+                doc, input_file, output_dir, page_ranges, stem or source_stem(input_file),
+                progress, cancel, workers,
+            )
+        finally:
+            doc.close()
     
     def split_every_n_pages(
         self, 
-        input_file: Path, 
-        output_dir: Path, 
-        pages_per_split: int
-    ) -> list[Path]:
+        input_file: PdfSource, 
+        output_dir: Path | None, 
+        pages_per_split: int,
+        stem: str | None = None,
+        progress: ProgressCallback | None = None,
+        cancel: CancelToken | None = None,
+        workers: int = 1,
+    ) -> list[Path] | list[tuple[str, bytes]]:
         """
         Split a PDF into multiple files with N pages each.
         
         Args:
-            input_file: Path to the input PDF file
-            output_dir: Directory where split files will be saved
+            input_file: Path or in-memory buffer of the input PDF
+            output_dir: Directory where split files will be saved, or None
+                to return them in memory
             pages_per_split: Number of pages per output file
+            stem: Base name for output files
+            progress: Optional callback receiving a "files" event after
+                each output file
+            cancel: Optional token checked after each output file
+            workers: Number of processes used to build and write the output
+                files
             
         Returns:
-            List of paths to the created PDF files
+            List of paths to the created PDF files, or of (file name, PDF
+            bytes) pairs if output_dir is None
         """
         self._validate_file(input_file)
         
         if pages_per_split < 1:
             raise ValueError("Pages per split must be at least 1")
+        if workers < 1:
+            raise ValueError("Workers must be at least 1")
+        if workers > 1:
+            input_file = shareable_source(input_file)
         
-        doc = fitz.open(input_file)
-        total_pages = len(doc)
-        doc.close()
-        
-        # Generate page ranges
-        page_ranges = []
-        for start in range(1, total_pages + 1, pages_per_split):
-            end = min(start + pages_per_split - 1, total_pages)
-            page_ranges.append((start, end))
-        
-        return self.split_by_pages(input_file, output_dir, page_ranges)
+        # The document is opened once to count its pages and to build every
+        # output file.
+        doc = open_pdf(input_file)
+        try:
+            total_pages = len(doc)
+            page_ranges = []
+            for start in range(1, total_pages + 1, pages_per_split):
+                end = min(start + pages_per_split - 1, total_pages)
+                page_ranges.append((start, end))
+            
+            return self._split_document(
+                doc, input_file, output_dir, page_ranges, stem or source_stem(input_file),
+                progress, cancel, workers,
+            )
+        finally:
+            doc.close()
     
     def extract_pages(
         self, 
-        input_file: Path, 
-        output_file: Path, 
-        pages: list[int]
-    ) -> Path:
+        input_file: PdfSource, 
+        output_file: PdfTarget, 
+        pages: list[int],
+        progress: ProgressCallback | None = None,
+        cancel: CancelToken | None = None,
+    ) -> PdfResult:
         """
         Extract specific pages from a PDF into a new file.
         
         Args:
-            input_file: Path to the input PDF file
-            output_file: Path for the output PDF file
-            pages: List of page numbers to extract (1-indexed)
+            input_file: Path or in-memory buffer of the input PDF
+            output_file: Path or stream for the output PDF, or None to
+                return it as bytes
+            pages: List of page numbers to extract (1-indexed), in the order
+                they should appear; a page may be listed more than once
+            progress: Optional callback receiving a "pages" event after
+                each page
+            cancel: Optional token checked after each page
             
         Returns:
-            Path to the created PDF file
+            The written path or stream, or the PDF bytes
         """
         self._validate_file(input_file)
-        output_file.parent.mkdir(parents=True, exist_ok=True)
         
-        doc = fitz.open(input_file)
+        doc = open_pdf(input_file)
         total_pages = len(doc)
         
         # Validate pages
@@ -125,26 +165,185 @@ class PdfSplitter:
                     f"Document has {total_pages} pages."
                 )
         
-        new_doc = fitz.open()
-        for page in pages:
-            new_doc.insert_pdf(doc, from_page=page - 1, to_page=page - 1)
-        
-        new_doc.save(output_file)
-        new_doc.close()
-        doc.close()
+        runs = _page_runs(pages)
+        new_doc = new_pdf()
+        try:
+            done = 0
+            for idx, (first, last) in enumerate(runs):
+                # Keeping insert_pdf()'s object map until the last run
+                # (final=False) copies resources shared by the pages once.
+                low, high = min(first, last), max(first, last)
+                new_doc.insert_pdf(
+                    doc,
+                    from_page=first - 1,
+                    to_page=last - 1,
+                    links=any(_has_annots(doc, page_num) for page_num in range(low - 1, high)),
+                    final=idx == len(runs) - 1,
+                )
+                done += high - low + 1
+                checkpoint(progress, cancel, "pages", done, len(pages))
+            
+            output = save_pdf(new_doc, output_file, self._save_profile)
+        finally:
+            new_doc.close()
+            doc.close()
         
-        return output_file
+        return output
     
-    def get_page_count(self, input_file: Path) -> int:
-        """Get the number of pages in a PDF file."""
+    def get_page_count(self, input_file: PdfSource) -> int:
+        """Get the number of pages in a PDF file or buffer."""
         self._validate_file(input_file)
-        doc = fitz.open(input_file)
+        doc = open_pdf(input_file)
         count = len(doc)
         doc.close()
         return count
 
-    def _validate_file(self, file: Path) -> None:
+    def _split_document(
+        self,
+        doc: "fitz.Document",
+        source: PdfSource,
+        output_dir: Path | None,
+        page_ranges: list[tuple[int, int]],
+        stem: str,
+        progress: ProgressCallback | None,
+        cancel: CancelToken | None,
+        workers: int,
+    ) -> list[Path] | list[tuple[str, bytes]]:
+        """Write each page range of an open document to its own file."""
+        total_pages = len(doc)
+        for start, end in page_ranges:
+            if start < 1 or end > total_pages or start > end:
+                raise ValueError(
+                    f"Invalid page range ({start}-{end}). "
+                    f"Document has {total_pages} pages."
+                )
+        
+        if output_dir is not None:
+            output_dir.mkdir(parents=True, exist_ok=True)
+        
+        chunks = []
+        for idx, (start, end) in enumerate(page_ranges):
+            if len(page_ranges) == 1:
+                output_name = f"{stem}_pages_{start}-{end}.pdf"
+            else:
+                output_name = f"{stem}_part{idx + 1}_pages_{start}-{end}.pdf"
+            chunks.append((start, end, output_name))
+        
+        if workers > 1 and len(chunks) > 1:
+            return self._split_parallel(source, output_dir, chunks, progress, cancel, workers)
+        
+        output_files = []
+        for done, (start, end, output_name) in enumerate(chunks, start=1):
+            output_files.append(_write_chunk(doc, start, end, output_name, output_dir, self._save_profile))
+            checkpoint(progress, cancel, "files", done, len(chunks))
+        
+        return output_files
+
+    def _split_parallel(
+        self,
+        source: Path | bytes,
+        output_dir: Path | None,
+        chunks: list[tuple[int, int, str]],
+        progress: ProgressCallback | None,
+        cancel: CancelToken | None,
+        workers: int,
+    ) -> list[Path] | list[tuple[str, bytes]]:
+        batches = contiguous_batches(chunks, workers, _BATCHES_PER_WORKER)
+        
+        output_files = []
+        with worker_pool(
+            min(workers, len(batches)),
+            initializer=_open_worker_source,
+            initargs=(source,),
+        ) as executor:
+            # map() yields the batches in order, so the output keeps the
+            # order of the ranges.
+            for written in executor.map(
+                _write_chunks,
+                batches,
+                [output_dir] * len(batches),
+                [self._save_profile] * len(batches),
+            ):
+                output_files.extend(written)
+                checkpoint(progress, cancel, "files", len(output_files), len(chunks))
+        
+        return output_files
+
+    def _validate_file(self, file: PdfSource) -> None:
+        if not isinstance(file, Path):
+            return
         if not file.exists():
             raise FileNotFoundError(f"File not found: {file}")
         if file.suffix.lower() != ".pdf":
             raise ValueError(f"Not a PDF file: {file}")
+
+
+def _page_runs(pages: list[int]) -> list[tuple[int, int]]:
+    """
+    Coalesce page numbers into runs of consecutive pages.
+
+    Runs may ascend or descend; order and duplicates are kept, e.g.
+    [5, 1, 1, 2, 3, 9, 8] gives [(5, 5), (1, 1), (1, 3), (9, 8)].
+    """
+    runs: list[tuple[int, int]] = []
+    step = 0
+    for page in pages:
+        if runs:
+            first, last = runs[-1]
+            if first == last and abs(page - last) == 1:
+                step = page - last
+                runs[-1] = (first, page)
+                continue
+            if first != last and page - last == step:
+                runs[-1] = (first, page)
+                continue
+        runs.append((page, page))
+    return runs
+
+
+def _has_annots(doc: "fitz.Document", page_num: int) -> bool:
+    """Whether a page has annotations (links among them), without loading it."""
+    return doc.xref_get_key(doc.page_xref(page_num), "Annots")[0] != "null"
+
+
+# Batches of output files handed to each split worker
+_BATCHES_PER_WORKER = 4
+
+# Source document of a split worker process, opened once per process
+_worker_doc: "fitz.Document | None" = None
+
+
+def _open_worker_source(source: Path | bytes) -> None:
+    global _worker_doc
+    _worker_doc = open_pdf(source)
+
+
+def _write_chunks(
+    chunks: list[tuple[int, int, str]],
+    output_dir: Path | None,
+    profile: SaveProfile | None,
+) -> list[Path] | list[tuple[str, bytes]]:
+    """Write a batch of output files from the worker's source document."""
+    return [_write_chunk(_worker_doc, start, end, name, output_dir, profile) for start, end, name in chunks]
+
+
+def _write_chunk(
+    doc: "fitz.Document",
+    start: int,
+    end: int,
+    output_name: str,
+    output_dir: Path | None,
+    profile: SaveProfile | None = None,
+) -> Path | tuple[str, bytes]:
+    """Copy pages start to end (1-indexed) into a new file, or into bytes if output_dir is None."""
+    # insert_pdf() loads every copied page to look for links unless told not
+    # to, so only ask for that on ranges with annotations.
+    links = any(_has_annots(doc, page_num) for page_num in range(start - 1, end))
+    new_doc = new_pdf()
+    try:
+        new_doc.insert_pdf(doc, from_page=start - 1, to_page=end - 1, links=links)
+        if output_dir is None:
+            return output_name, save_pdf(new_doc, None, profile)
+        return save_pdf(new_doc, output_dir / output_name, profile)
+    finally:
+        new_doc.close()
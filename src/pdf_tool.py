@@ -1,54 +1,161 @@
 from pathlib import Path
 
-from .pdf_merger import PdfMerger
-from .pdf_compressor import PdfCompressor, CompressionLevel
+from .pdf_merger import MergeStats, PdfMerger
+from .pdf_compressor import PdfCompressor, CompressionLevel, CompressionStats
 from .pdf_splitter import PdfSplitter
+from .image_cache import ImageCache
+from .pdf_io import PdfResult, PdfSource, PdfTarget, SaveProfile
+from .pdf_optimizer import OptimizeOptions
+from .progress import CancelToken, ProgressCallback
 
 
 class PdfTool:
-    def __init__(self):
-        self._merger = PdfMerger()
-        self._splitter = PdfSplitter()
+    """
+    Facade over the merge, split and compress engines.
 
-    def merge(self, input_files: list[Path], output_file: Path) -> Path:
-        return self._merger.merge(input_files, output_file)
+    Inputs may be paths or in-memory buffers (bytes, memoryview, BytesIO);
+    passing None as the output returns the result as bytes, so callers such
+    as the web app never touch the disk.
+
+    Every operation accepts an optional progress callback, which receives a
+    ProgressEvent after each file, page or image, and an optional CancelToken;
+    cancelling it makes the operation raise OperationCancelled at its next
+    step.
+
+    A save profile, if given, sets the format every operation writes its
+    output in (see SAVE_PROFILES in pdf_io).
+    """
+
+    def __init__(self, save_profile: SaveProfile | None = None):
+        self._save_profile = save_profile
+        self._merger = PdfMerger(save_profile)
+        self._splitter = PdfSplitter(save_profile)
+        self._compression_stats: CompressionStats | None = None
+
+    def merge(
+        self,
+        input_files: list[PdfSource],
+        output_file: PdfTarget = None,
+        progress: ProgressCallback | None = None,
+        cancel: CancelToken | None = None,
+        batch_size: int | None = None,
+        workers: int = 1,
+        deduplicate: bool = False,
+    ) -> PdfResult:
+        """
+        Merge PDFs; with a batch_size, in streaming mode with bounded memory,
+        with several workers, merging groups of inputs in parallel, and with
+        deduplicate, keeping one copy of resources shared by the inputs.
+        """
+        return self._merger.merge(
+            input_files,
+            output_file,
+            progress=progress,
+            cancel=cancel,
+            batch_size=batch_size,
+            workers=workers,
+            deduplicate=deduplicate,
+        )
     
     def split_by_ranges(
         self, 
-        input_file: Path, 
-        output_dir: Path, 
-        page_ranges: list[tuple[int, int]]
-    ) -> list[Path]:
+        input_file: PdfSource, 
+        output_dir: Path | None, 
+        page_ranges: list[tuple[int, int]],
+        stem: str | None = None,
+        progress: ProgressCallback | None = None,
+        cancel: CancelToken | None = None,
+        workers: int = 1,
+    ) -> list[Path] | list[tuple[str, bytes]]:
         """Split PDF by page ranges."""
-        return self._splitter.split_by_pages(input_file, output_dir, page_ranges)
+        return self._splitter.split_by_pages(input_file, output_dir, page_ranges, stem, progress, cancel, workers)
     
     def split_every_n_pages(
         self, 
-        input_file: Path, 
-        output_dir: Path, 
-        pages_per_split: int
-    ) -> list[Path]:
+        input_file: PdfSource, 
+        output_dir: Path | None, 
+        pages_per_split: int,
+        stem: str | None = None,
+        progress: ProgressCallback | None = None,
+        cancel: CancelToken | None = None,
+        workers: int = 1,
+    ) -> list[Path] | list[tuple[str, bytes]]:
         """Split PDF into chunks of N pages."""
-        return self._splitter.split_every_n_pages(input_file, output_dir, pages_per_split)
+        return self._splitter.split_every_n_pages(
+            input_file, output_dir, pages_per_split, stem, progress, cancel, workers
+        )
     
     def extract_pages(
         self, 
-        input_file: Path, 
-        output_file: Path, 
-        pages: list[int]
-    ) -> Path:
+        input_file: PdfSource, 
+        output_file: PdfTarget, 
+        pages: list[int],
+        progress: ProgressCallback | None = None,
+        cancel: CancelToken | None = None,
+    ) -> PdfResult:
         """Extract specific pages from a PDF."""
-        return self._splitter.extract_pages(input_file, output_file, pages)
+        return self._splitter.extract_pages(input_file, output_file, pages, progress, cancel)
     
-    def get_page_count(self, input_file: Path) -> int:
+    def get_page_count(self, input_file: PdfSource) -> int:
         """Get the number of pages in a PDF."""
         return self._splitter.get_page_count(input_file)
 
     def compress(
         self,
-        input_file: Path,
-        output_file: Path | None = None,
+        input_file: PdfSource,
+        output_file: PdfTarget = None,
+        level: CompressionLevel = CompressionLevel.MEDIUM,
+        workers: int = 1,
+        cache: ImageCache | None = None,
+        progress: ProgressCallback | None = None,
+        cancel: CancelToken | None = None,
+        target_size: int | None = None,
+        optimize: OptimizeOptions | None = None,
+    ) -> PdfResult:
+        """
+        Compress images; with a target_size in bytes, only as much as needed to fit it.
+
+        With optimize, fonts, content streams and other non-image data are
+        optimized as well.
+        """
+        compressor = PdfCompressor(
+            level,
+            workers=workers,
+            cache=cache,
+            optimize=optimize,
+            save_profile=self._save_profile,
+        )
+        result = compressor.compress(input_file, output_file, progress, cancel, target_size)
+        self._compression_stats = compressor.stats
+        return result
+
+    def merge_and_compress(
+        self,
+        input_files: list[PdfSource],
+        output_file: PdfTarget = None,
         level: CompressionLevel = CompressionLevel.MEDIUM,
-    ) -> Path:
-        compressor = PdfCompressor(level)
-        return compressor.compress(input_file, output_file)
+        workers: int = 1,
+        cache: ImageCache | None = None,
+        progress: ProgressCallback | None = None,
+        cancel: CancelToken | None = None,
+        batch_size: int | None = None,
+    ) -> PdfResult:
+        """
+        Merge PDFs and compress their images in a single pass.
+
+        workers processes first merge groups of inputs, then recompress images.
+        """
+        compressor = PdfCompressor(level, workers=workers, cache=cache)
+        result = self._merger.merge(input_files, output_file, compressor, progress, cancel, batch_size, workers)
+        self._compression_stats = compressor.stats
+        return result
+
+    @property
+    def merge_stats(self) -> MergeStats:
+        """Statistics of the most recent merge() or merge_and_compress() call."""
+        return self._merger.stats
+
+    @property
+    def compression_stats(self) -> CompressionStats | None:
+        """Statistics of the most recent compress() call, if any."""
+        return self._compression_stats
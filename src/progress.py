@@ -0,0 +1,100 @@
+import math
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Callable, Iterator, Sequence, TypeVar
+
+T = TypeVar("T")
+
+
+class OperationCancelled(Exception):
+    """Raised inside a PDF operation once its cancel token has been cancelled."""
+
+
+class CancelToken:
+    """
+    Cancellation flag checked by the PDF engines between pages, files and
+    images.
+
+    Subclasses may override the cancelled property to read the flag from
+    elsewhere, e.g. memory shared with another process.
+    """
+
+    def __init__(self):
+        self._cancelled = False
+
+    def cancel(self) -> None:
+        self._cancelled = True
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled
+
+    def raise_if_cancelled(self) -> None:
+        if self.cancelled:
+            raise OperationCancelled()
+
+
+@dataclass(frozen=True)
+class ProgressEvent:
+    """Progress of a running operation."""
+
+    stage: str  # "files", "parts", "pages" or "images": the unit counted by done/total
+    done: int
+    total: int
+    bytes_saved: int = 0  # So far, for operations that recompress images
+
+
+# Called with a ProgressEvent after every unit of work
+ProgressCallback = Callable[[ProgressEvent], None]
+
+
+def checkpoint(
+    progress: ProgressCallback | None,
+    cancel: CancelToken | None,
+    stage: str,
+    done: int,
+    total: int,
+    bytes_saved: int = 0,
+) -> None:
+    """
+    Report progress and stop if the operation was cancelled.
+
+    Does nothing but two None checks when neither a callback nor a token is
+    given, so loops can call it unconditionally.
+
+    Raises:
+        OperationCancelled: If the cancel token has been cancelled
+    """
+    if cancel is not None:
+        cancel.raise_if_cancelled()
+    if progress is not None:
+        progress(ProgressEvent(stage, done, total, bytes_saved))
+
+
+@contextmanager
+def worker_pool(max_workers: int, **kwargs) -> Iterator[ProcessPoolExecutor]:
+    """ProcessPoolExecutor(max_workers, **kwargs) that is shut down with shutdown_pool() on exit."""
+    executor = ProcessPoolExecutor(max_workers=max_workers, **kwargs)
+    try:
+        yield executor
+    finally:
+        shutdown_pool(executor)
+
+
+def shutdown_pool(executor: ProcessPoolExecutor) -> None:
+    """Wait for the running tasks of a pool and stop its workers."""
+    # The tasks still waiting for a worker are dropped, so an operation
+    # stopped by OperationCancelled returns without running them.
+    executor.shutdown(cancel_futures=True)
+
+
+def contiguous_batches(items: Sequence[T], workers: int, per_worker: int) -> list[Sequence[T]]:
+    """
+    Split items into about per_worker contiguous batches per worker, in order.
+
+    More batches than workers keep every worker busy when some items take
+    longer than others, and progress moving as batches finish.
+    """
+    size = math.ceil(len(items) / (workers * per_worker))
+    return [items[i:i + size] for i in range(0, len(items), size)]
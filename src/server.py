@@ -0,0 +1,211 @@
+import json
+import os
+import socket
+import socketserver
+import stat
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+
+from .client import default_socket
+from .pdf_compressor import CompressionLevel
+from .pdf_io import make_private_dir
+from .pdf_tool import PdfTool
+
+
+class PdfServer:
+    """
+    Long-lived PDF Tool process serving requests on a Unix domain socket.
+
+    Requests are handled by a pool of worker processes that stay alive
+    between requests, so each one skips interpreter start-up and the
+    PyMuPDF and Pillow imports a fresh command pays. Every connection sends
+    JSON requests, one per line, and receives one JSON response line per
+    request, in order; connections are served concurrently.
+
+    The socket is created readable and writable by the current user only,
+    since requests name arbitrary files to read and write. If a worker
+    process dies, the request it was running fails and the pool is replaced.
+    """
+
+    def __init__(self, socket_path: Path | None = None, workers: int = os.cpu_count() or 1):
+        """
+        Args:
+            socket_path: Socket to listen on, client.default_socket() if None
+            workers: Number of worker processes kept running
+        """
+        if not hasattr(socketserver, "ThreadingUnixStreamServer"):
+            raise RuntimeError("Unix domain sockets are not supported on this platform")
+        if workers < 1:
+            raise ValueError("Workers must be at least 1")
+        if socket_path is None:
+            socket_path = default_socket()
+            make_private_dir(socket_path.parent)
+        self._socket_path = socket_path
+        self._remove_stale_socket()
+
+        executor = _start_executor(workers)
+        old_umask = os.umask(0o177)
+        try:
+            self._server = _SocketServer(str(socket_path), _RequestHandler)
+        except BaseException:
+            executor.shutdown(cancel_futures=True)
+            raise
+        finally:
+            os.umask(old_umask)
+        self._server.executor = executor
+        self._server.workers = workers
+        self._server.executor_lock = threading.Lock()
+
+    @property
+    def socket_path(self) -> Path:
+        return self._socket_path
+
+    def serve_forever(self) -> None:
+        """Serve requests until shutdown() is called or the process is interrupted."""
+        try:
+            self._server.serve_forever()
+        finally:
+            self.close()
+
+    def shutdown(self) -> None:
+        """Stop serve_forever(), from another thread."""
+        self._server.shutdown()
+
+    def close(self) -> None:
+        self._server.server_close()
+        self._server.executor.shutdown(cancel_futures=True)
+        self._socket_path.unlink(missing_ok=True)
+
+    def _remove_stale_socket(self) -> None:
+        try:
+            mode = self._socket_path.lstat().st_mode
+        except FileNotFoundError:
+            return
+        if not stat.S_ISSOCK(mode):
+            raise RuntimeError(f"{self._socket_path} exists and is not a socket")
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+            try:
+                probe.connect(str(self._socket_path))
+            except OSError:
+                # Left behind by a server that did not shut down cleanly.
+                self._socket_path.unlink()
+                return
+        raise RuntimeError(f"A server is already listening on {self._socket_path}")
+
+
+if hasattr(socketserver, "ThreadingUnixStreamServer"):
+    class _SocketServer(socketserver.ThreadingUnixStreamServer):
+        daemon_threads = True
+        executor: ProcessPoolExecutor
+        workers: int
+        executor_lock: threading.Lock
+
+        def replace_executor(self, broken: ProcessPoolExecutor) -> None:
+            """Replace a pool one of whose workers died, which fails every later request."""
+            with self.executor_lock:
+                # Every handler waiting on the pool sees it break; the first
+                # one replaces it.
+                if self.executor is broken:
+                    broken.shutdown(wait=False, cancel_futures=True)
+                    self.executor = _start_executor(self.workers)
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self) -> None:
+        for line in self.rfile:
+            try:
+                request = json.loads(line)
+            except ValueError as e:
+                response = {"ok": False, "error": f"Invalid request: {e}"}
+            else:
+                executor = self.server.executor
+                try:
+                    response = executor.submit(handle_request, request).result()
+                except BrokenProcessPool:
+                    response = {"ok": False, "error": "The worker process running the request died"}
+                    self.server.replace_executor(executor)
+            self.wfile.write(json.dumps(response).encode() + b"\n")
+
+
+def _start_executor(workers: int) -> ProcessPoolExecutor:
+    executor = ProcessPoolExecutor(max_workers=workers, initializer=_warm_up)
+    # Starting the workers now moves their start-up cost out of the first
+    # requests.
+    for future in [executor.submit(handle_request, {"op": "ping"}) for _ in range(workers)]:
+        future.result()
+    return executor
+
+
+def _warm_up() -> None:
+    """Import the image libraries in a new worker before its first request."""
+    import PIL.Image  # noqa: F401
+
+
+def handle_request(request: dict) -> dict:
+    """
+    Run one request, in a worker process.
+
+    Requests, with paths absolute:
+        {"op": "compress", "input", "output", "level": "low".."extreme"}
+        {"op": "merge", "inputs", "output", "batch_size", "deduplicate"}
+        {"op": "split", "input", "output_dir", "every" or "ranges": [[1, 3], ...]}
+        {"op": "extract", "input", "output", "pages": [1, 3, ...]}
+        {"op": "ping"}
+
+    Returns:
+        {"ok": True, "result": {...}, "seconds": ...} or {"ok": False, "error": "..."}
+    """
+    start = time.perf_counter()
+    try:
+        result = _run(request)
+    except Exception as e:
+        return {"ok": False, "error": str(e) or type(e).__name__}
+    return {"ok": True, "result": result, "seconds": time.perf_counter() - start}
+
+
+def _run(request: dict) -> dict:
+    op = request.get("op")
+    tool = PdfTool()
+
+    if op == "ping":
+        return {"pid": os.getpid()}
+
+    if op == "compress":
+        input_file = Path(request["input"])
+        output = Path(request["output"]) if request.get("output") else None
+        level = CompressionLevel[request.get("level", "medium").upper()]
+        result = tool.compress(input_file, output, level)
+        stats = tool.compression_stats
+        return {
+            "output": str(result),
+            "input_size": input_file.stat().st_size,
+            "output_size": result.stat().st_size,
+            "images_compressed": stats.images_compressed,
+        }
+
+    if op == "merge":
+        result = tool.merge(
+            [Path(p) for p in request["inputs"]],
+            Path(request["output"]),
+            batch_size=request.get("batch_size"),
+            deduplicate=request.get("deduplicate", False),
+        )
+        return {"output": str(result), "pages": tool.merge_stats.pages, "output_size": result.stat().st_size}
+
+    if op == "split":
+        input_file = Path(request["input"])
+        output_dir = Path(request["output_dir"])
+        if request.get("every") is not None:
+            results = tool.split_every_n_pages(input_file, output_dir, request["every"])
+        else:
+            results = tool.split_by_ranges(input_file, output_dir, [tuple(r) for r in request["ranges"]])
+        return {"outputs": [str(p) for p in results]}
+
+    if op == "extract":
+        result = tool.extract_pages(Path(request["input"]), Path(request["output"]), request["pages"])
+        return {"output": str(result), "output_size": result.stat().st_size}
+
+    raise ValueError(f"Unknown operation: {op}")
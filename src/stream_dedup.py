@@ -0,0 +1,176 @@
+import hashlib
+import re
+from typing import TYPE_CHECKING, Iterator
+
+if TYPE_CHECKING:
+    import fitz
+
+# An indirect reference such as "12 0 R"
+_REFERENCE = re.compile(r"(?<![\d.])(\d+) 0 R\b")
+
+# Dictionaries whose identity matters even when their content is the same:
+# pages, page tree nodes, annotations, form fields, outline and structure items.
+_UNSHAREABLE_TYPES = {"/Page", "/Pages", "/Catalog", "/Annot", "/OCG", "/StructElem"}
+_UNSHAREABLE_KEYS = {"Parent", "Kids", "P", "FT", "Rect"}
+
+
+def deduplicate_streams(doc: "fitz.Document") -> tuple[int, int]:
+    """
+    Point every reference to a duplicate object at a single copy.
+
+    Streams are duplicates when both their dictionaries and their raw
+    (still encoded) data match, e.g. the same font program, ICC profile or
+    logo carried by every merged input. Once streams are collapsed, the small
+    objects referring to them (font dictionaries, color space arrays,
+    resource dictionaries) often become identical as well and are collapsed
+    in turn. Duplicates are only unreferenced here; saving with garbage
+    collection removes them.
+
+    Returns:
+        Tuple of (duplicate objects, bytes of stream data and object source
+        they held)
+    """
+    duplicates: dict[int, int] = {}
+    canonical: dict[bytes, int] = {}
+    keys: dict[int, bytes] = {}
+    bytes_saved = 0
+    referrers = _build_referrers(doc)
+
+    pending = list(range(1, doc.xref_length()))
+    # Redirecting references can make further objects identical, so repeat
+    # on the objects that changed.
+    while pending:
+        found: dict[int, int] = {}
+        for xref in pending:
+            source = doc.xref_object(xref, compressed=True)
+            if not _is_shareable(doc, xref, source):
+                continue
+
+            digest = hashlib.sha256(source.encode())
+            size = len(source)
+            if doc.xref_is_stream(xref):
+                raw = doc.xref_stream_raw(xref)
+                digest.update(b"stream")
+                digest.update(raw)
+                size += len(raw)
+            key = digest.digest()
+
+            previous = keys.pop(xref, None)
+            if previous is not None and canonical.get(previous) == xref:
+                del canonical[previous]
+
+            target = canonical.setdefault(key, xref)
+            if target == xref:
+                keys[xref] = key
+            else:
+                found[xref] = target
+                bytes_saved += size
+
+        if not found:
+            break
+        duplicates.update(found)
+        pending = _redirect_references(doc, found, duplicates, referrers)
+
+    return len(duplicates), bytes_saved
+
+
+def _is_shareable(doc: "fitz.Document", xref: int, source: str) -> bool:
+    if source == "null":
+        return False
+    top_level_keys = doc.xref_get_keys(xref)
+    if _UNSHAREABLE_KEYS.intersection(top_level_keys):
+        return False
+    if "Type" in top_level_keys and doc.xref_get_key(xref, "Type")[1] in _UNSHAREABLE_TYPES:
+        return False
+    return True
+
+
+def references(source: str) -> Iterator[re.Match]:
+    """
+    Indirect references in the source of an object, such as "12 0 R", as
+    matches whose group 1 is the object number. Text inside string
+    literals is skipped.
+    """
+    if "(" not in source:
+        yield from _REFERENCE.finditer(source)
+        return
+    for start, end in _outside_strings(source):
+        yield from _REFERENCE.finditer(source, start, end)
+
+
+def _outside_strings(source: str) -> Iterator[tuple[int, int]]:
+    """Spans of an object's source between its string literals, which may nest parentheses."""
+    start = pos = 0
+    while (pos := source.find("(", pos)) != -1:
+        yield start, pos
+        depth = 0
+        while pos < len(source):
+            char = source[pos]
+            if char == "\\":
+                pos += 1
+            elif char == "(":
+                depth += 1
+            elif char == ")":
+                depth -= 1
+                if depth == 0:
+                    break
+            pos += 1
+        pos += 1
+        start = pos
+    yield start, len(source)
+
+
+def _rewrite_references(source: str, mapping: dict[int, int]) -> str:
+    parts = []
+    pos = 0
+    for match in references(source):
+        xref = int(match[1])
+        if xref in mapping:
+            parts.append(source[pos:match.start()])
+            parts.append(f"{mapping[xref]} 0 R")
+            pos = match.end()
+    parts.append(source[pos:])
+    return "".join(parts)
+
+
+def _build_referrers(doc: "fitz.Document") -> dict[int, set[int]]:
+    """Map every referenced object to the objects whose source refers to it."""
+    referrers: dict[int, set[int]] = {}
+    for xref in range(1, doc.xref_length()):
+        for match in references(doc.xref_object(xref, compressed=True)):
+            referrers.setdefault(int(match[1]), set()).add(xref)
+    return referrers
+
+
+def _redirect_references(
+    doc: "fitz.Document",
+    mapping: dict[int, int],
+    skip: dict[int, int],
+    referrers: dict[int, set[int]],
+) -> list[int]:
+    """
+    Rewrite references according to mapping in the objects referring to
+    them, other than those in skip, and update referrers to match.
+
+    Returns:
+        The objects that changed
+    """
+    changed: set[int] = set()
+    for old, new in mapping.items():
+        referring = referrers.pop(old, set()).difference(skip)
+        referrers.setdefault(new, set()).update(referring)
+        changed.update(referring)
+
+    for xref in sorted(changed):
+        if doc.xref_is_stream(xref):
+            # update_object() would drop the stream data, so stream
+            # dictionaries are rewritten key by key.
+            for key in doc.xref_get_keys(xref):
+                _, value = doc.xref_get_key(xref, key)
+                new_value = _rewrite_references(value, mapping)
+                if new_value != value:
+                    doc.xref_set_key(xref, key, new_value)
+        else:
+            doc.update_object(xref, _rewrite_references(doc.xref_object(xref, compressed=True), mapping))
+
+    return sorted(changed)